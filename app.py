@@ -14,6 +14,8 @@ Multi Publish
 """
 
 import os
+import json
+import traceback
 import tank
 from tank import TankError
 
@@ -27,8 +29,32 @@ class MultiPublish(tank.platform.Application):
         self.log_debug("Initializing tk-agnostic-publish")
         
         tk_multi_publish = self.import_module("tk_multi_publish")
+        self._tk_multi_publish = tk_multi_publish
+        self._copy_strategy_chain = tk_multi_publish.CopyStrategyChain(self.get_setting("copy_strategies"))
+        self._directory_cache = tk_multi_publish.DirectoryCache()
+        self._publish_lookups = {}
+
+        # uploads to shotgun carry on in the background after a publish:
+        self._upload_queue = tk_multi_publish.UploadQueue(tank.util.shotgun.create_sg_connection,
+                                                          self.get_setting("upload_threads"),
+                                                          journal_dir=os.path.join(self.cache_location, "upload_queue"),
+                                                          state_dir=os.path.join(self.cache_location, "uploads"),
+                                                          chunk_size=self.get_setting("upload_chunk_size_mb") * 1024 * 1024,
+                                                          thumbnail_dir=os.path.join(self.cache_location, "upload_thumbnails"))
+        self._upload_queue.start()
+        self._preview_cache = tk_multi_publish.PreviewCache(self.get_setting("preview_cache_root") or None,
+                                                            self.get_setting("preview_cache_size_mb"))
+        self._thumbnail_sharer = tk_multi_publish.ThumbnailSharer(self.tank.shotgun)
+        self._version_index = tk_multi_publish.VersionIndex(os.path.join(self.cache_location, "version_index"))
+        self._template_cache = tk_multi_publish.TemplateCache()
+        self._frame_hashes = tk_multi_publish.FrameHashes()
+        self._publish_name_formatters = {}
         
         self._publish_handler = tk_multi_publish.PublishHandler(self)
+
+        # values for the fields the hooks would ask the user for while
+        # a batch publish is running, None when publishing interactively:
+        self.batch_fields = None
         
         # register commands:
         display_name = self.get_setting("display_name")
@@ -46,6 +72,15 @@ class MultiPublish(tank.platform.Application):
                                      self._publish_handler.show_publish_dlg, 
                                      params)
 
+        if not self.engine.has_ui:
+            # publish from the command line, e.g.
+            #   tank Shot sh010 publish_batch comp.aep renders/comp.0001.exr -f name=master
+            self.engine.register_command("publish_batch",
+                                         self._run_batch_command,
+                                         {"short_name": "publish_batch",
+                                          "title": "Batch %s" % display_name,
+                                          "description": "Publish files into Shotgun without the publish dialog"})
+
     @property
     def context_change_allowed(self):
         """
@@ -55,6 +90,87 @@ class MultiPublish(tank.platform.Application):
 
     def destroy_app(self):
         self.log_debug("Destroying tk-agnostic-publish")
+        # don't hold up closing for a long upload, it's
+        # picked up again by a later session:
+        self._upload_queue.stop(timeout=10)
+
+    @property
+    def upload_queue(self):
+        """
+        The queue of uploads to Shotgun that run in the background
+        """
+        return self._upload_queue
+
+    def publish_batch(self, primary_path, secondary_paths=None, fields=None, comment="", **kwargs):
+        """
+        Publish files without the publish dialog, running the same hooks.
+
+        :param primary_path:    The path of the primary file
+        :param secondary_paths: List of paths of secondary files
+        :param fields:          Dictionary of values for the fields the publish
+                                would ask the user for, e.g. name
+        :param comment:         The comment for the publish
+        :returns:               Dictionary describing the result, see BatchPublisher.publish
+                                for the other arguments
+        """
+        publisher = self._tk_multi_publish.BatchPublisher(self, self._publish_handler)
+        return publisher.publish(primary_path, secondary_paths, fields, comment, **kwargs)
+
+    def _run_batch_command(self, *args):
+        """
+        Entry point of the publish_batch command
+        """
+        kwargs = self._tk_multi_publish.parse_command_line(list(args))
+        output = kwargs.pop("output")
+        result = self.publish_batch(**kwargs)
+        self._tk_multi_publish.write_result(result, output)
+        if not result["success"]:
+            raise TankError("Batch publish failed:\n%s" % "\n".join(result["errors"]))
+
+    def ask_for_field(self, key, title, message, default=""):
+        """
+        Utility method for hooks to ask the user for the value of a field.
+        During a batch publish the value is taken from the fields given
+        for the publish instead, or the initial value if it wasn't given.
+
+        :param key:     The name of the field
+        :param title:   The title of the dialog
+        :param message: The message to show the user
+        :param default: The initial value
+        :returns:       The value, or None if the user cancelled
+        """
+        if self.batch_fields is not None:
+            value = self.batch_fields.get(key)
+            if value is None:
+                value = default
+            if not value:
+                raise TankError("No value was given for the '%s' field" % key)
+            return "%s" % value
+
+        from tank.platform.qt import QtGui
+        value, ok = QtGui.QInputDialog.getText(None, title, message, text=default)
+        return value if ok else None
+
+    def report_exception(self, title):
+        """
+        Utility method for hooks to show the exception being handled to
+        the user.  During a batch publish nobody would see it so the
+        exception is raised again to fail the publish.
+
+        :param title:   The title of the dialog
+        """
+        if self.batch_fields is not None:
+            raise
+        from tank.platform.qt import QtGui
+        QtGui.QMessageBox.warning(None, title, traceback.format_exc())
+
+    @property
+    def template_cache(self):
+        """
+        The TemplateCache shared by the hooks for the session to parse
+        paths and build paths from fields with templates
+        """
+        return self._template_cache
         
     def copy_file(self, source_path, target_path, task):
         """
@@ -67,6 +183,118 @@ class MultiPublish(tank.platform.Application):
                           target_path=target_path,
                           task=task)
 
+    def transfer_file(self, source_path, target_path):
+        """
+        Utility method to copy the contents of source_path to
+        target_path using the first of the 'copy_strategies' from
+        the configuration that works between the two mounts.  The
+        target folder must already exist.
+
+        :returns:   The name of the strategy that was used
+        """
+        strategy = self._copy_strategy_chain.copy(source_path, target_path)
+        self.log_debug("Copied %s --> %s (%s)" % (source_path, target_path, strategy))
+        return strategy
+
+    def copy_files(self, pairs, task, progress_cb=None):
+        """
+        Utility method to copy a list of (source_path, target_path)
+        pairs in a single call.  Uses the copy files hook specified
+        in the configuration
+
+        :returns:   A list of (source_path, target_path, error) tuples
+                    for any files that failed to copy
+        """
+        return self.execute_hook("hook_copy_files",
+                                 pairs=pairs,
+                                 task=task,
+                                 progress_cb=progress_cb)
+
+    def copy_file_sequence(self, pairs, task, progress_cb=None, copy_fn=None):
+        """
+        Utility method to copy a list of (source_path, target_path)
+        pairs concurrently.  Each file is copied with copy_fn or, if
+        that isn't specified, with the copy file hook.  The number of
+        files copied at the same time is taken from the 'copy_threads'
+        setting of the task output.
+
+        :param pairs:       List of (source_path, target_path) tuples
+        :param task:        The publish task the files are being copied for
+        :param progress_cb: Optional function called as progress_cb(completed, total)
+                            as files finish copying
+        :param copy_fn:     Optional thread safe function called as
+                            copy_fn(source_path, target_path) to copy each file
+        :returns:           A list of (source_path, target_path, error) tuples
+                            for any files that failed to copy
+        """
+        # create the target folders up front so that the copy threads
+        # don't race each other creating them:
+        for folder in set(os.path.dirname(target_path) for _, target_path in pairs):
+            self.ensure_folder_exists(folder)
+
+        if not copy_fn:
+            copy_fn = lambda source_path, target_path: self.copy_file(source_path, target_path, task)
+        engine = self._tk_multi_publish.CopyEngine(copy_fn, task["output"].get("copy_threads", 1))
+        return engine.run(pairs, progress_cb)
+
+    def copy_sequence_delta(self, frames, task, publish_path, previous_publish_paths, progress_cb=None):
+        """
+        Utility method to publish the frames of a sequence, copying only the
+        frames that have changed since the previous published version.
+        Unchanged frames are hard linked from the previous version, or copied
+        if that isn't possible.  A manifest describing the frames is written
+        next to the published sequence once all frames are in place.
+
+        :param frames:                  List of (frame, source_path, target_path) tuples
+        :param task:                    The publish task the frames are being copied for
+        :param publish_path:            The publish path of the sequence
+        :param previous_publish_paths:  Publish paths of earlier versions of the sequence,
+                                        newest first.  Only the newest that was published
+                                        is compared against, if it has a manifest.
+        :param progress_cb:             Optional function called as progress_cb(completed, total)
+                                        as frames finish copying
+        :returns:                       A list of (source_path, target_path, error) tuples
+                                        for any frames that failed to copy
+        """
+        previous = None
+        for previous_publish_path in previous_publish_paths:
+            previous = self._tk_multi_publish.PublishManifest.load(previous_publish_path)
+            if previous or self._tk_multi_publish.PublishManifest.is_published(previous_publish_path,
+                                                                                self.list_directory):
+                break
+
+        manifest, link_frames, copy_pairs = self._tk_multi_publish.plan_delta_publish(
+            frames, publish_path, previous, task["output"].get("copy_threads", 1), self._frame_hashes)
+
+        for folder in set(os.path.dirname(target_path) for _, _, target_path in frames):
+            self.ensure_folder_exists(folder)
+
+        for previous_path, source_path, target_path in link_frames:
+            try:
+                if os.path.lexists(target_path):
+                    if os.path.samefile(previous_path, target_path):
+                        continue
+                    os.remove(target_path)
+                os.link(previous_path, target_path)
+            except (AttributeError, OSError):
+                # can't link so copy the frame instead:
+                copy_pairs.append((source_path, target_path))
+
+        self.log_debug("Publishing %s: %d of %d frames unchanged since %s"
+                       % (publish_path, len(frames) - len(copy_pairs), len(frames),
+                          previous.publish_path if previous else "- (no previous version)"))
+
+        # a target left by an earlier attempt at this version may be a link to
+        # the previous version's frame, so writing into it would change that:
+        for _, target_path in copy_pairs:
+            if os.path.lexists(target_path):
+                os.remove(target_path)
+
+        errors = self.copy_files(copy_pairs, task, progress_cb)
+        if not errors:
+            manifest.save()
+        return errors
+
     def post_context_change(self, old_context, new_context):
         """
         Runs after a context change has completed.
@@ -74,37 +302,276 @@ class MultiPublish(tank.platform.Application):
         :param old_context: The sgtk.context.Context being switched from.
         :param new_context: The sgtk.context.Context being switched to.
         """
+        self._directory_cache.clear()
+        self._publish_lookups = {}
+        self._publish_handler.forget_shotgun_tasks()
+        self._template_cache.clear()
+        self._frame_hashes.clear()
         self._publish_handler.rebuild_primary_output()
 
 
-    def detect_image_sequence(self, filepath):
+    def list_directory(self, path):
+        """
+        Utility method returning the names of the entries in a directory.
+        Listings are cached and shared by all hooks until the directory
+        is modified.
+        """
+        return self._directory_cache.listdir(path)
 
+    def detect_sequence(self, filepath):
+        """
+        Return the ImageSequence, with its head, tail, padding and sorted
+        frame numbers, that the file belongs to.  The file itself doesn't
+        need to exist.  Returns None if the file isn't part of a sequence.
+        """
+        basedir = os.path.dirname(filepath)
+        if not os.path.isdir(basedir):
+            return None
+        return self._directory_cache.sequence_index(basedir).find(filepath)
+
+    def detect_folder_sequences(self, folder):
+        """
+        Return a list of all the ImageSequence objects in a folder
+        """
+        return self._directory_cache.sequence_index(folder).sequences()
+
+    def find_highest_version(self, template, fields, skip_keys=None):
+        """
+        Utility method returning the highest version on disk of the paths
+        matching a template, or 0 if there aren't any.  Results are kept in
+        a persistent index and the disk is only scanned again when one of
+        the folders new versions appear in has been modified.
+
+        :param template:    The template with a {version} key
+        :param fields:      Fields for the template
+        :param skip_keys:   Keys to match any value of as well as version
+        """
+        skip_keys = set(skip_keys or []) | set(["version"])
+        fixed_fields = sorted((name, str(value)) for name, value in fields.items()
+                              if name not in skip_keys and name in template.keys)
+        depths = self._tk_multi_publish.watch_depths(template.definition, skip_keys)
+        # the watched depths are part of the key so entries indexed
+        # with fewer folders watched aren't trusted:
+        key = json.dumps([template.definition, sorted(skip_keys), fixed_fields, depths])
+
+        def scan():
+            highest_version = 0
+            folders = set()
+            for path in self.tank.paths_from_template(template, fields, list(skip_keys)):
+                # each path is only parsed once so isn't worth caching:
+                version = template.get_fields(path).get("version") or 0
+                highest_version = max(highest_version, version)
+                for depth in depths:
+                    folder = path
+                    for _ in range(depth):
+                        folder = os.path.dirname(folder)
+                    folders.add(folder)
+            return highest_version, list(folders)
+
+        return self._version_index.highest_version(template.root_path, key, scan)
+
+    def read_aepx(self, path):
+        """
+        Utility method returning an AepxDocument that streams the contents
+        of an After Effects XML project rather than loading it into memory
+        """
+        return self._tk_multi_publish.AepxDocument(path)
+
+    def rewrite_aepx(self, source_path, target_path, references):
+        """
+        Utility method to write a copy of an After Effects XML project with
+        the paths of its file references replaced.  The project is streamed
+        in a single pass so memory use doesn't depend on its size.
+
+        :param source_path: The path of the .aepx to copy
+        :param target_path: The path to write the copy to
+        :param references:  Dictionary of old path -> new path
+        """
+        try:
+            count = self._tk_multi_publish.AepxDocument(source_path).rewrite(target_path, references)
+        except self._tk_multi_publish.AepxError as e:
+            raise TankError(str(e))
+        self.log_debug("Replaced %d file references in %s" % (count, target_path))
+
+    def detect_sequences(self, paths):
+        """
+        Group a list of file paths into image sequences.
+
+        :returns:   A (sequences, singles) tuple where sequences is a list of
+                    ImageSequence objects and singles is a list of the paths
+                    that aren't part of a sequence
+        """
+        index = self._tk_multi_publish.SequenceIndex(paths)
+        singles = []
+        for path in paths:
+            sequence = index.find(path)
+            if not sequence or len(sequence) == 1:
+                singles.append(path)
+        sequences = [sequence for sequence in index.sequences() if len(sequence) > 1]
+        return sequences, singles
+
+    def detect_image_sequence(self, filepath):
         """
         Method to retrieve a list of sequence files corresponding to the input filepath
-        http://blender.stackexchange.com/questions/21092/how-to-get-all-images-for-an-image-sequence-from-python
         """
+        sequence = self.detect_sequence(filepath)
+        return sequence.paths() if sequence else []
 
-        basedir, filename = os.path.split(filepath)
-        filename_noext, ext = os.path.splitext(filename)
+    def encode_preview(self, sequence, movie_path, frame_rate=24, progress_cb=None, preset="slow", chunk_size=0):
+        """
+        Utility method to create a preview movie from an ImageSequence by
+        streaming its frames into ffmpeg, without writing any intermediate
+        files.
+
+        :param sequence:    The ImageSequence to create the movie from
+        :param movie_path:  Path of the movie to write
+        :param frame_rate:  Frame rate of the movie
+        :param progress_cb: Optional function called as progress_cb(completed, total)
+                            as frames are encoded
+        :param preset:      The x264 preset to encode with
+        :param chunk_size:  If set, the frames are split into segments of this many
+                            frames that are encoded in parallel and then joined
+        """
+        stream = self._tk_multi_publish.PreviewStream(
+            frame_rate=frame_rate, encode_args=self._tk_multi_publish.h264_encode_args(preset))
+        try:
+            if chunk_size:
+                stream.encode_segmented(sequence.iter_paths(), movie_path, chunk_size, progress_cb=progress_cb)
+            else:
+                stream.encode(sequence.iter_paths(), movie_path, progress_cb)
+        except self._tk_multi_publish.PreviewError as e:
+            raise TankError(str(e))
 
-        from string import digits
-        if isinstance(filepath, bytes):
-            digits = digits.encode()
-        filename_nodigits = filename_noext.rstrip(digits)
+    def preview_cache_key(self, sequence, settings, workers=1):
+        """
+        Utility method returning the key of the preview movie for a sequence
+        in the preview cache.  The key is a hash of the content of every frame
+        together with the settings the movie is encoded with.  Frame hashes
+        are shared with delta publishes so frames are only read once.
+        Returns None if the preview cache is disabled.
 
-        if len(filename_nodigits) == len(filename_noext):
-            # input isn't from a sequence
-            return []
+        :param sequence:    The ImageSequence the movie is created from
+        :param settings:    Dictionary of all the settings the movie is encoded with
+        :param workers:     The number of threads to read frames with
+        """
+        if not self.get_setting("preview_cache_size_mb"):
+            return None
+        return self._preview_cache.key(self._frame_hashes.get_all(sequence.iter_paths(), workers), settings)
 
-        files = os.listdir(basedir)
-        elements = [
-            os.path.join(basedir, f)
-            for f in files
-            if f.startswith(filename_nodigits) and
-               f.endswith(ext) and
-               f[len(filename_nodigits):-len(ext) if ext else -1].isdigit()]
+    def get_cached_preview(self, key):
+        """
+        Utility method returning the path of the cached preview movie
+        for a key or None if it isn't in the cache
+        """
+        if not key:
+            return None
+        return self._preview_cache.get(key)
 
-        return elements
+    def cache_preview(self, key, movie_path):
+        """
+        Utility method to add a preview movie to the preview cache.  The
+        cache is only an optimisation so failing to write to it is logged
+        rather than failing the publish.
+        """
+        if not key:
+            return
+        try:
+            self._preview_cache.put(key, movie_path)
+        except (IOError, OSError) as e:
+            self.log_warning("Failed to add %s to the preview cache: %s" % (movie_path, e))
+
+    def find_publishes(self, paths):
+        """
+        Utility method to find the publishes for a list of paths with a single
+        Shotgun query.  Results are remembered for the rest of the session so
+        paths that have been looked up before don't cause another query.
+
+        :param paths:   List of paths to look up
+        :returns:       Dictionary of path -> publish for the paths that are published
+        """
+        missing = list(set(path for path in paths if path not in self._publish_lookups))
+        if missing:
+            found = tank.util.find_publish(self.tank, missing)
+            for path in missing:
+                self._publish_lookups[path] = found.get(path)
+        return dict((path, self._publish_lookups[path]) for path in paths if self._publish_lookups[path])
+
+    def forget_publishes(self):
+        """
+        Utility method to forget the results of earlier find_publishes
+        calls, e.g. once new publishes have been registered
+        """
+        self._publish_lookups = {}
+
+    def create_registration_queue(self):
+        """
+        Utility method returning a RegistrationQueue that registers
+        publishes with Shotgun in batches
+        """
+        return self._tk_multi_publish.RegistrationQueue(self.tank,
+                                                        tank.util.register_publish,
+                                                        tank.util.find_publish,
+                                                        self.get_setting("registration_batch_size"),
+                                                        self._thumbnail_sharer.attach,
+                                                        self._tk_multi_publish.supports_dry_run(self.tank.version))
+
+    def share_thumbnail(self, entities, thumbnail_path):
+        """
+        Utility method to set the thumbnail of a list of Shotgun entities.
+        Each thumbnail file is only uploaded once, entities it is attached
+        to after that share the uploaded image.
+
+        :param entities:        List of entity dictionaries with type and id keys
+        :param thumbnail_path:  The path of the thumbnail image
+        """
+        self._thumbnail_sharer.attach(entities, thumbnail_path)
+
+    def queue_upload(self, entity_type, entity_id, path, field=None, fallback_thumbnail_path=None):
+        """
+        Utility method to upload a file to a Shotgun entity in the background.
+        The upload is retried if it fails.
+
+        :param entity_type:             The type of the entity to upload to
+        :param entity_id:               The id of the entity to upload to
+        :param path:                    The path of the file to upload
+        :param field:                   The field to upload the file to or None to
+                                        upload it as the thumbnail
+        :param fallback_thumbnail_path: Optional thumbnail to upload instead if the
+                                        file can't be uploaded.  A copy is kept until
+                                        the upload finishes so the file itself can be
+                                        removed straight away.
+        """
+        job = self._tk_multi_publish.UploadJob(entity_type, entity_id, path, field, fallback_thumbnail_path)
+        return self._upload_queue.add(job)
+
+    def run_commands(self, commands, progress_cb=None, popen_kwargs=None):
+        """
+        Utility method to run a list of commands as subprocesses, as many at
+        the same time as there are cores.  Stops at the first command that
+        fails.
+
+        :param commands:        List of commands, each one a list of arguments
+        :param progress_cb:     Optional function called as progress_cb(completed, total)
+                                as commands finish
+        :param popen_kwargs:    Optional dictionary of extra arguments for subprocess.Popen
+        """
+        pool = self._tk_multi_publish.ProcessPool(popen_kwargs=popen_kwargs)
+        try:
+            pool.run(commands, progress_cb)
+        except self._tk_multi_publish.ProcessError as e:
+            raise TankError(str(e))
+
+    def get_publish_name_formatter(self, template, strip_keys=("version", "artist")):
+        """
+        Return the PublishNameFormatter for a template, building it
+        the first time it's asked for
+        """
+        key = (template.name, template.definition, tuple(strip_keys))
+        formatter = self._publish_name_formatters.get(key)
+        if formatter is None:
+            formatter = self._tk_multi_publish.PublishNameFormatter(template, strip_keys)
+            self._publish_name_formatters[key] = formatter
+        return formatter
 
     def _get_publish_name(self, path, template, fields=None):
         """
@@ -112,83 +579,5 @@ class MultiPublish(tank.platform.Application):
         this will return a 'versionless' name
         """
         # first, extract the fields from the path using the template:
-        fields = fields.copy() if fields else template.get_fields(path)
-        '''
-        if "name" in fields and fields["name"]:
-            # well, that was easy!
-            name = fields["name"]
-        else:
-        '''
-        # find out if version is used in the file name:
-        template_name, _ = os.path.splitext(os.path.basename(template.definition))
-        version_in_name = "{version}" in template_name
-        artist_in_name = '{artist}' in template_name
-
-        # extract the file name from the path:
-        name, _ = os.path.splitext(os.path.basename(path))
-        delims_str = "_-. "
-        if version_in_name:
-            # looks like version is part of the file name so we
-            # need to isolate it so that we can remove it safely.
-            # First, find a dummy version whose string representation
-            # doesn't exist in the name string
-            version_key = template.keys["version"]
-            dummy_version = 9876
-            while True:
-                test_str = version_key.str_from_value(dummy_version)
-                if test_str not in name:
-                    break
-                dummy_version += 1
-
-            # now use this dummy version and rebuild the path
-            fields["version"] = dummy_version
-            path = template.apply_fields(fields)
-            name, _ = os.path.splitext(os.path.basename(path))
-
-            # we can now locate the version in the name and remove it
-            dummy_version_str = version_key.str_from_value(dummy_version)
-
-            v_pos = name.find(dummy_version_str)
-            # remove any preceeding 'v'
-            pre_v_str = name[:v_pos].rstrip("v")
-            post_v_str = name[v_pos + len(dummy_version_str):]
-
-            if (pre_v_str and post_v_str
-                and pre_v_str[-1] in delims_str
-                and post_v_str[0] in delims_str):
-                # only want one delimiter - strip the second one:
-                post_v_str = post_v_str.lstrip(delims_str)
-
-            versionless_name = pre_v_str + post_v_str
-            versionless_name = versionless_name.strip(delims_str)
-
-            if versionless_name:
-                # great - lets use this!
-                name = versionless_name
-            else:
-                # likely that version is only thing in the name so
-                # instead, replace the dummy version with #'s:
-                zero_version_str = version_key.str_from_value(0)
-                new_version_str = "#" * len(zero_version_str)
-                name = name.replace(dummy_version_str, new_version_str)
-
-        if artist_in_name:
-            artist = fields['artist']
-            a_pos = name.find(artist)
-            pre_a_str = name[:a_pos]
-            post_a_str = name[a_pos + len(artist):]
-            if (pre_a_str and post_a_str
-                and pre_a_str[-1] in delims_str
-                and post_a_str[0] in delims_str):
-                # only want one delimiter - strip the second one:
-                post_v_str = post_v_str.lstrip(delims_str)
-
-            artistless_name = pre_a_str + post_a_str
-            artistless_name = artistless_name.strip(delims_str)
-
-            if artistless_name:
-                name = artistless_name
-            else:
-                name = name.replace(artist, 'artist')
-
-        return name
\ No newline at end of file
+        fields = fields or self._template_cache.get_fields(template, path)
+        return self.get_publish_name_formatter(template).format(fields, path)
\ No newline at end of file
@@ -0,0 +1,40 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Helpers shared by the benchmark scripts
+"""
+
+import os
+import sys
+import time
+import types
+import importlib
+
+PYTHON_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "python")
+
+def import_app_module(module_name):
+    """
+    Import a module from the tk_multi_publish package without running
+    the package __init__, which needs a running Toolkit engine.
+    """
+    if "tk_multi_publish" not in sys.modules:
+        package = types.ModuleType("tk_multi_publish")
+        package.__path__ = [os.path.join(PYTHON_FOLDER, "tk_multi_publish")]
+        sys.modules["tk_multi_publish"] = package
+    return importlib.import_module("tk_multi_publish.%s" % module_name)
+
+def timed(fn, *args, **kwargs):
+    """
+    Call fn and return a (seconds, result) tuple
+    """
+    start = time.time()
+    result = fn(*args, **kwargs)
+    return time.time() - start, result
@@ -0,0 +1,125 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Upload a movie in chunks to a local stand-in HTTP server that drops the
+connection every few requests, resuming after each failure, and check
+the file arrives intact:
+
+    python benchmarks/chunked_upload_benchmark.py --size-mb 200 --chunk-mb 8 --drop-every 7
+"""
+
+import os
+import re
+import shutil
+import hashlib
+import argparse
+import tempfile
+import threading
+
+try:
+    from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+except ImportError:
+    # python 3
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+
+from bench_util import import_app_module, timed
+
+class StandInServer(HTTPServer):
+    """
+    Accepts Content-Range PUTs, keeping the received bytes in memory
+    """
+    def __init__(self, drop_every):
+        HTTPServer.__init__(self, ("127.0.0.1", 0), StandInHandler)
+        self.drop_every = drop_every
+        self.requests = 0
+        self.bytes_received = 0
+        self.files = {}
+        self.completed = {}
+
+class StandInHandler(BaseHTTPRequestHandler):
+
+    def log_message(self, *args):
+        pass
+
+    def do_PUT(self):
+        self.server.requests += 1
+        data = self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.bytes_received += len(data)
+        if self.server.drop_every and self.server.requests % self.server.drop_every == 0:
+            # simulate a dropped connection:
+            self.close_connection = True
+            return
+        match = re.match(r"bytes (\d+)-(\d+)/(\d+)", self.headers["Content-Range"])
+        buf = self.server.files.setdefault(self.path, bytearray())
+        offset = int(match.group(1))
+        buf[offset:offset + len(data)] = data
+        self.send_response(200)
+        self.send_header("ETag", hashlib.md5(data).hexdigest())
+        self.end_headers()
+
+    def do_POST(self):
+        path = self.path.split("?")[0]
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.completed[path] = bytes(self.server.files.pop(path))
+        self.send_response(200)
+        self.end_headers()
+
+def upload_with_retries(uploader, path):
+    failures = 0
+    while True:
+        try:
+            uploader.upload(path, "bench:%s" % path)
+            return failures
+        except Exception:
+            failures += 1
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=64, help="Size of the movie in MB")
+    parser.add_argument("--chunk-mb", type=int, default=8, help="Size of each chunk in MB")
+    parser.add_argument("--drop-every", type=int, default=5, help="Drop every Nth request, 0 to never drop")
+    args = parser.parse_args()
+
+    chunked_upload = import_app_module("chunked_upload")
+
+    server = StandInServer(args.drop_every)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+
+    temp_dir = tempfile.mkdtemp(prefix="tk_upload_bench_")
+    try:
+        movie_path = os.path.join(temp_dir, "review.mov")
+        with open(movie_path, "wb") as f:
+            for _ in range(args.size_mb):
+                f.write(os.urandom(1024 * 1024))
+
+        transport = chunked_upload.HttpPutTransport("http://127.0.0.1:%d/upload" % server.server_address[1])
+        uploader = chunked_upload.ChunkedUploader(transport, os.path.join(temp_dir, "state"),
+                                                  args.chunk_mb * 1024 * 1024)
+        seconds, failures = timed(upload_with_retries, uploader, movie_path)
+
+        with open(movie_path, "rb") as f:
+            expected = f.read()
+        received = list(server.completed.values())
+        if len(received) != 1 or received[0] != expected:
+            raise RuntimeError("The uploaded file doesn't match the movie")
+
+        print("%d MB in %.3f seconds, %d dropped requests resumed" % (args.size_mb, seconds, failures))
+        print("%.1f MB received by the server, %.1f MB re-sent"
+              % (server.bytes_received / 1048576.0,
+                 (server.bytes_received - len(expected)) / 1048576.0))
+    finally:
+        server.shutdown()
+        shutil.rmtree(temp_dir)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Measure the linear to sRGB conversion of the color engine for half and
+full float frames, with and without the LUT fast path (needs numpy):
+
+    python benchmarks/color_engine_benchmark.py --width 3840 --height 2160 --frames 20
+"""
+
+import argparse
+
+import numpy
+
+from bench_util import import_app_module, timed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--width", type=int, default=1920, help="Width of the frames")
+    parser.add_argument("--height", type=int, default=1080, help="Height of the frames")
+    parser.add_argument("--frames", type=int, default=20, help="Number of frames to convert")
+    args = parser.parse_args()
+
+    color_engine = import_app_module("color_engine")
+
+    pixels = numpy.random.random_sample((3, args.height, args.width)) * 1.2 - 0.1
+    frames = {"float": [channel.astype(numpy.float32).tobytes() for channel in pixels],
+              "half": [channel.astype(numpy.float16).tobytes() for channel in pixels]}
+
+    def convert_naive(channels, dtype):
+        # allocates new arrays for every step of every frame
+        for _ in range(args.frames):
+            linear = numpy.dstack([numpy.frombuffer(data, dtype=dtype).reshape(args.height, args.width)
+                                   for data in channels]).astype(numpy.float32)
+            srgb = color_engine.srgb_transfer(numpy.clip(linear, 0.0, 1.0))
+            (srgb * 255.0 + 0.5).astype(numpy.uint8).tobytes()
+
+    def convert_engine(channels, half, use_lut):
+        engine = color_engine.ColorEngine(use_lut)
+        for _ in range(args.frames):
+            engine.convert(channels, args.width, args.height, half)
+
+    print("%d frames at %dx%d" % (args.frames, args.width, args.height))
+    print("%-8s %-10s %12s" % ("pixels", "method", "ms/frame"))
+    for pixel_type, dtype in [("float", numpy.float32), ("half", numpy.float16)]:
+        channels = frames[pixel_type]
+        half = pixel_type == "half"
+        for name, fn, fn_args in [("naive", convert_naive, (channels, dtype)),
+                                  ("exact", convert_engine, (channels, half, False)),
+                                  ("lut", convert_engine, (channels, half, True))]:
+            seconds, _ = timed(fn, *fn_args)
+            print("%-8s %-10s %12.1f" % (pixel_type, name, 1000.0 * seconds / args.frames))
+
+if __name__ == "__main__":
+    main()
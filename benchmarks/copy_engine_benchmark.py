@@ -0,0 +1,65 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Measure the throughput of the sequence copy engine against the number
+of worker threads using a synthetic frame sequence:
+
+    python benchmarks/copy_engine_benchmark.py --frames 500 --size-kb 2048 --target /mnt/nas/tmp
+"""
+
+import os
+import shutil
+import argparse
+import tempfile
+
+from bench_util import import_app_module, timed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--frames", type=int, default=200, help="Number of frames in the sequence")
+    parser.add_argument("--size-kb", type=int, default=1024, help="Size of each frame in KB")
+    parser.add_argument("--workers", default="1,2,4,8,16", help="Comma separated worker counts to test")
+    parser.add_argument("--target", default=None, help="Folder to copy into, e.g. a network mount")
+    args = parser.parse_args()
+
+    copy_engine = import_app_module("copy_engine")
+
+    source_dir = tempfile.mkdtemp(prefix="tk_copy_bench_src_")
+    target_root = tempfile.mkdtemp(prefix="tk_copy_bench_dst_", dir=args.target)
+    try:
+        payload = os.urandom(args.size_kb * 1024)
+        pairs = []
+        for frame in range(1, args.frames + 1):
+            name = "render.%04d.exr" % frame
+            with open(os.path.join(source_dir, name), "wb") as f:
+                f.write(payload)
+            pairs.append((os.path.join(source_dir, name), name))
+
+        total_mb = args.frames * args.size_kb / 1024.0
+        print("%d frames, %.1f MB per run" % (args.frames, total_mb))
+        print("%8s %10s %10s" % ("workers", "seconds", "MB/s"))
+
+        for workers in [int(w) for w in args.workers.split(",")]:
+            target_dir = os.path.join(target_root, "w%d" % workers)
+            os.makedirs(target_dir)
+            run_pairs = [(source, os.path.join(target_dir, name)) for source, name in pairs]
+            engine = copy_engine.CopyEngine(shutil.copy, workers)
+            seconds, errors = timed(engine.run, run_pairs)
+            if errors:
+                raise RuntimeError("Copy failed: %s" % (errors[0],))
+            print("%8d %10.3f %10.1f" % (workers, seconds, total_mb / seconds))
+            shutil.rmtree(target_dir)
+    finally:
+        shutil.rmtree(source_dir)
+        shutil.rmtree(target_root)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+In-memory stand-in for a Shotgun connection so the publish can be
+benchmarked without a live site
+"""
+
+import os
+import time
+import copy
+import threading
+import collections
+
+class MockConfig(object):
+    """
+    The parts of shotgun_api3's connection config the app looks at
+    """
+    scheme = "https"
+    server = "mock.shotgunstudio.com"
+
+class MockShotgun(object):
+    """
+    Keeps entities in memory and answers the subset of the shotgun_api3
+    API used by Toolkit and the publish hooks.  Every request sleeps for
+    a fixed latency, and uploads for as long as they would take at a
+    given bandwidth, so the cost of round trips shows up in timings.
+    """
+
+    def __init__(self, latency=0.05, upload_mb_per_second=0):
+        """
+        Construction
+
+        :param latency:                 Seconds each request takes
+        :param upload_mb_per_second:    Upload bandwidth, 0 for instant uploads
+        """
+        self.latency = latency
+        self.upload_mb_per_second = upload_mb_per_second
+        self.base_url = "https://%s" % MockConfig.server
+        self.config = MockConfig()
+        self.calls = collections.Counter()
+        self.bytes_uploaded = 0
+
+        self._entities = collections.defaultdict(dict)
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def seed(self, entity_type, data):
+        """
+        Add an entity without counting a request, returning it.  The
+        entity keeps the id in data if there is one.
+        """
+        with self._lock:
+            return self._create(entity_type, data, data.get("id"))
+
+    def reset_calls(self):
+        self.calls = collections.Counter()
+        self.bytes_uploaded = 0
+
+    def find(self, entity_type, filters, fields=None, order=None, filter_operator=None, limit=0, **kwargs):
+        self._request("find")
+        return self._find(entity_type, filters, fields, order, filter_operator, limit)
+
+    def find_one(self, entity_type, filters, fields=None, order=None, filter_operator=None, **kwargs):
+        self._request("find_one")
+        found = self._find(entity_type, filters, fields, order, filter_operator, 1)
+        return found[0] if found else None
+
+    def create(self, entity_type, data, return_fields=None):
+        self._request("create")
+        with self._lock:
+            return self._create(entity_type, data)
+
+    def update(self, entity_type, entity_id, data, **kwargs):
+        self._request("update")
+        with self._lock:
+            return self._update(entity_type, entity_id, data)
+
+    def delete(self, entity_type, entity_id):
+        self._request("delete")
+        with self._lock:
+            return self._entities[entity_type].pop(entity_id, None) is not None
+
+    def batch(self, requests):
+        """
+        Run a list of create, update and delete requests as a single request
+        """
+        self._request("batch")
+        results = []
+        with self._lock:
+            for request in requests:
+                request_type = request["request_type"]
+                if request_type == "create":
+                    results.append(self._create(request["entity_type"], request["data"]))
+                elif request_type == "update":
+                    results.append(self._update(request["entity_type"], request["entity_id"], request["data"]))
+                elif request_type == "delete":
+                    results.append(self._entities[request["entity_type"]].pop(request["entity_id"], None) is not None)
+                else:
+                    raise ValueError("Invalid request_type '%s' in batch" % request_type)
+        return results
+
+    def upload(self, entity_type, entity_id, path, field_name=None, display_name=None, tag_list=None):
+        self._request("upload")
+        self._transfer(path)
+        attachment = self.seed("Attachment", {"this_file": {"name": display_name or os.path.basename(path)}})
+        if field_name:
+            with self._lock:
+                self._update(entity_type, entity_id, {field_name: {"type": "Attachment", "id": attachment["id"]}})
+        return attachment["id"]
+
+    def upload_thumbnail(self, entity_type, entity_id, path, **kwargs):
+        self._request("upload_thumbnail")
+        self._transfer(path)
+        with self._lock:
+            self._update(entity_type, entity_id, {"image": "%s/thumbnail/%s" % (self.base_url, os.path.basename(path))})
+        return entity_id
+
+    def share_thumbnail(self, entities, thumbnail_path=None, source_entity=None, filmstrip_thumbnail=False, **kwargs):
+        self._request("share_thumbnail")
+        if thumbnail_path:
+            self._transfer(thumbnail_path)
+            image = "%s/thumbnail/%s" % (self.base_url, os.path.basename(thumbnail_path))
+        else:
+            image = self._find(source_entity["type"], [["id", "is", source_entity["id"]]], ["image"])[0]["image"]
+        with self._lock:
+            for entity in entities:
+                self._update(entity["type"], entity["id"], {"image": image})
+        return 1
+
+    def _request(self, name):
+        self.calls[name] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _transfer(self, path):
+        size = os.path.getsize(path)
+        self.bytes_uploaded += size
+        if self.upload_mb_per_second:
+            time.sleep(size / (self.upload_mb_per_second * 1024.0 * 1024.0))
+
+    def _store(self, data):
+        """
+        Copy field values to store, keeping only the type, id and
+        name of linked entities as Shotgun does
+        """
+        stored = {}
+        for field, value in data.items():
+            if isinstance(value, dict) and "type" in value and "id" in value:
+                value = {"type": value["type"], "id": value["id"], "name": value.get("name", value.get("code"))}
+            elif isinstance(value, list):
+                value = [self._store({"v": v})["v"] for v in value]
+            stored[field] = copy.deepcopy(value)
+        return stored
+
+    def _create(self, entity_type, data, entity_id=None):
+        entity = self._store(data)
+        entity["type"] = entity_type
+        entity["id"] = entity_id or self._next_id
+        self._next_id = max(self._next_id, entity["id"]) + 1
+        self._entities[entity_type][entity["id"]] = entity
+        return copy.deepcopy(entity)
+
+    def _update(self, entity_type, entity_id, data):
+        entity = self._entities[entity_type].get(entity_id)
+        if entity is None:
+            raise ValueError("%s %s does not exist" % (entity_type, entity_id))
+        entity.update(self._store(data))
+        return copy.deepcopy(entity)
+
+    def _find(self, entity_type, filters, fields=None, order=None, filter_operator=None, limit=0):
+        with self._lock:
+            found = [entity for entity in self._entities[entity_type].values()
+                     if self._matches(entity, filters, filter_operator or "all")]
+            for sort in reversed(order or []):
+                found.sort(key=lambda entity: self._sort_key(entity, sort["field_name"]),
+                           reverse=sort.get("direction") == "desc")
+            if limit:
+                found = found[:limit]
+            return [self._result(entity, fields) for entity in found]
+
+    def _result(self, entity, fields):
+        result = {"type": entity["type"], "id": entity["id"]}
+        for field in fields or entity.keys():
+            result[field] = copy.deepcopy(self._value(entity, field))
+        return result
+
+    def _value(self, entity, field):
+        """
+        Return the value of a field, following linked fields such
+        as entity.Shot.code
+        """
+        parts = field.split(".")
+        value = entity.get(parts[0])
+        while len(parts) >= 3 and isinstance(value, dict):
+            linked = self._entities[parts[1]].get(value.get("id"))
+            if linked is None or value.get("type") != parts[1]:
+                return None
+            value = linked.get(parts[2])
+            parts = parts[2:]
+        return value
+
+    def _sort_key(self, entity, field):
+        value = self._value(entity, field)
+        if isinstance(value, dict):
+            value = (value.get("type"), value.get("id"))
+        return (value is not None, value)
+
+    def _matches(self, entity, filters, filter_operator):
+        if isinstance(filters, dict):
+            return self._matches(entity, filters["filters"], filters["filter_operator"])
+        results = (self._matches_filter(entity, f) for f in filters)
+        return any(results) if filter_operator in ("any", "or") else all(results)
+
+    def _matches_filter(self, entity, f):
+        if isinstance(f, dict):
+            return self._matches(entity, f["filters"], f["filter_operator"])
+        field, op, values = f[0], f[1], f[2:]
+        value = self._value(entity, field)
+        if len(values) == 1 and op in ("in", "not_in") and isinstance(values[0], (list, tuple)):
+            values = values[0]
+        value = self._comparable(value)
+        values = [self._comparable(v) for v in values]
+        if op == "is":
+            return value == values[0]
+        if op == "is_not":
+            return value != values[0]
+        if op == "in":
+            return value in values
+        if op == "not_in":
+            return value not in values
+        if op == "contains":
+            return value is not None and values[0] in value
+        if op == "starts_with":
+            return value is not None and value.startswith(values[0])
+        if op == "ends_with":
+            return value is not None and value.endswith(values[0])
+        if op == "greater_than":
+            return value is not None and value > values[0]
+        if op == "less_than":
+            return value is not None and value < values[0]
+        raise ValueError("Unsupported filter operator '%s'" % op)
+
+    def _comparable(self, value):
+        if isinstance(value, dict) and "type" in value and "id" in value:
+            return (value["type"], value["id"])
+        return value
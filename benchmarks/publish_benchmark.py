@@ -0,0 +1,193 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Time every stage of a publish - scan, pre-publish, primary, secondary and
+post-publish - for a synthetic work file and render sequence, with Shotgun
+replaced by an in-memory stand-in that adds a fixed latency to each request:
+
+    python benchmarks/publish_benchmark.py --core /path/to/tk-core/python
+        --config /path/to/pipeline_configuration
+        --work-file /proj/sequences/sq01/sh010/comp/work/sh010_comp.v001.aep
+        --render /proj/sequences/sq01/sh010/comp/work/renders/sh010_comp.v001.%04d.exr
+        --frames 200 --latency 0.1
+
+The work file and render paths must match the templates of the app's
+configuration in the given pipeline configuration, and the engine must
+have this app configured in the context of the work file.  Synthetic
+content is written to any of them that don't exist yet.  Frames are
+copies of --frame-source, or a flat grey EXR written with OpenEXR.
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+
+from bench_util import timed
+from mock_shotgun import MockShotgun
+
+def write_work_file(path, size_mb):
+    if os.path.exists(path):
+        return
+    if not os.path.isdir(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+    with open(path, "wb") as f:
+        for _ in range(size_mb):
+            f.write(os.urandom(1024 * 1024))
+
+def write_frames(render_path, frames, frame_source, size):
+    """
+    Write the frames of a render sequence that don't exist yet,
+    returning the path of the first frame
+    """
+    folder = os.path.dirname(render_path)
+    if not os.path.isdir(folder):
+        os.makedirs(folder)
+
+    if not frame_source:
+        import OpenEXR
+        frame_source = os.path.join(folder, ".bench_frame.exr")
+        header = OpenEXR.Header(size, size)
+        grey = b"\x00\x00\x00\x3f" * (size * size)
+        exr = OpenEXR.OutputFile(frame_source, header)
+        exr.writePixels({"R": grey, "G": grey, "B": grey})
+        exr.close()
+
+    paths = [render_path % frame for frame in range(1, frames + 1)]
+    for path in paths:
+        if not os.path.exists(path):
+            shutil.copyfile(frame_source, path)
+    return paths[0]
+
+def install_mock_shotgun(tank, mock):
+    """
+    Make every Shotgun connection Toolkit and the app create use the mock
+    """
+    tank.util.shotgun.get_sg_connection = lambda *args, **kwargs: mock
+    tank.util.shotgun.create_sg_connection = lambda *args, **kwargs: mock
+
+def seed_context(mock, context, task_count):
+    """
+    Create the entities the publish looks up for the context of the work file
+    """
+    project = mock.seed("Project", dict(context.project))
+    entity = mock.seed(context.entity["type"], dict(context.entity, project=project)) if context.entity else project
+    step = mock.seed("Step", dict(context.step)) if context.step else None
+    for index in range(task_count):
+        mock.seed("Task", {"content": "task%02d" % index, "entity": entity, "step": step, "project": project})
+    mock.seed("PublishedFileType", {"code": "Rendered Image"})
+
+class StageTimer(object):
+    """
+    Times each stage of the publish with the Shotgun requests it made
+    """
+    def __init__(self, mock):
+        self._mock = mock
+        self.rows = []
+
+    def run(self, name, fn, *args, **kwargs):
+        self._mock.reset_calls()
+        seconds, result = timed(fn, *args, **kwargs)
+        self.rows.append((name, seconds, sum(self._mock.calls.values()), self._mock.bytes_uploaded))
+        return result
+
+    def report(self):
+        print("%-16s %10s %10s %12s" % ("stage", "seconds", "requests", "uploaded MB"))
+        for name, seconds, requests, uploaded in self.rows:
+            print("%-16s %10.3f %10d %12.1f" % (name, seconds, requests, uploaded / 1048576.0))
+        print("%-16s %10.3f" % ("total", sum(row[1] for row in self.rows)))
+
+def wait_for_uploads(app):
+    while app.upload_queue.is_busy():
+        time.sleep(0.1)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--core", default=None, help="Toolkit core python folder if sgtk isn't importable")
+    parser.add_argument("--config", required=True, help="Pipeline configuration of the project")
+    parser.add_argument("--engine", default="tk-shell", help="Engine to run the app in")
+    parser.add_argument("--app", default="tk-agnostic-publish", help="Instance name of the app")
+    parser.add_argument("--work-file", required=True, help="Primary work file to publish")
+    parser.add_argument("--render", required=True, help="Render sequence to publish, with a %%04d frame token")
+    parser.add_argument("--frames", type=int, default=100, help="Number of frames in the render sequence")
+    parser.add_argument("--frame-source", default=None, help="EXR to copy for every frame")
+    parser.add_argument("--frame-size", type=int, default=512, help="Size of generated frames in pixels")
+    parser.add_argument("--work-size-mb", type=int, default=50, help="Size of the generated work file in MB")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds each Shotgun request takes")
+    parser.add_argument("--upload-mbps", type=float, default=0, help="Upload bandwidth in MB/s, 0 for instant")
+    parser.add_argument("--tasks", type=int, default=10, help="Number of Shotgun tasks in the context")
+    parser.add_argument("--name", default="bench", help="Answer for the publish name prompts")
+    args = parser.parse_args()
+
+    if args.core:
+        sys.path.insert(0, args.core)
+    import sgtk
+    import tank
+
+    mock = MockShotgun(args.latency, args.upload_mbps)
+    install_mock_shotgun(tank, mock)
+
+    write_work_file(args.work_file, args.work_size_mb)
+    first_frame = write_frames(args.render, args.frames, args.frame_source, args.frame_size)
+
+    tk = sgtk.sgtk_from_path(args.config)
+    context = tk.context_from_path(args.work_file)
+    seed_context(mock, context, args.tasks)
+
+    engine = sgtk.platform.start_engine(args.engine, tk, context)
+    try:
+        app = engine.apps[args.app]
+        from tank.platform.qt import QtGui
+        # answer the prompts for missing template fields:
+        QtGui.QInputDialog.getText = staticmethod(lambda *a, **kw: (args.name, True))
+
+        handler = app._tk_multi_publish.PublishHandler(app)
+        timer = StageTimer(mock)
+
+        # the same state a drop of the work file and the render leaves behind:
+        extension = os.path.splitext(args.work_file)[1][1:]
+        output = [o for o in handler._primary_outputs if o.extension == extension][0]
+        handler._primary_output = output
+        app.agnostic_scene_contents["primary"] = {"type": "primary", "path": args.work_file, "output": output}
+        app.initialized_from = "primary"
+        timer.run("scan work file", handler.get_publish_tasks)
+        sequence = app.detect_sequence(first_frame)
+        app.agnostic_scene_contents["secondary"].append({"type": "secondary",
+                                                         "path": sequence.format_path(),
+                                                         "class": "sequence"})
+        app.initialized_from = "secondary"
+        tasks = timer.run("scan render", handler.get_publish_tasks)
+        sg_tasks = timer.run("shotgun tasks", handler.get_shotgun_tasks)
+
+        primary_task = [task for task in tasks if task.output == handler._primary_output][0]
+        secondary_tasks = [task for task in tasks if task is not primary_task]
+        sg_task = sg_tasks[0] if sg_tasks else None
+        progress_cb = lambda percent, msg=None, stage=None: None
+        user_data = {}
+
+        timer.run("pre-publish", handler._do_pre_publish, primary_task, secondary_tasks, progress_cb, user_data)
+        primary_path = timer.run("primary", handler._do_primary_publish, primary_task, sg_task, "",
+                                 "benchmark", progress_cb, user_data)
+        timer.run("secondary", handler._do_secondary_publish, secondary_tasks, primary_task, primary_path,
+                  sg_task, "", "benchmark", progress_cb, user_data)
+        timer.run("post-publish", handler._do_post_publish, primary_task, secondary_tasks, progress_cb, user_data)
+        timer.run("uploads", wait_for_uploads, app)
+
+        for task in [primary_task] + secondary_tasks:
+            for error in list(task.pre_publish_errors) + list(task.publish_errors):
+                print("%s, %s: %s" % (task.output.display_name, task.item.name, error))
+        timer.report()
+    finally:
+        engine.destroy()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Compare working out versionless publish names by rebuilding the path with
+a dummy version and searching for it against a PublishNameFormatter:
+
+    python benchmarks/publish_name_benchmark.py --names 20000
+"""
+
+import os
+import re
+import argparse
+
+from bench_util import import_app_module, timed
+
+DELIMITERS = "_-. "
+
+class IntegerKey(object):
+    def __init__(self, format_spec="03"):
+        self.format_spec = format_spec
+
+    def str_from_value(self, value):
+        return "%%%sd" % self.format_spec % value
+
+class StringKey(object):
+    def str_from_value(self, value):
+        return str(value)
+
+class Template(object):
+    """
+    Just enough of a Toolkit template to build paths from fields, with
+    the same cost profile of formatting every key of the definition
+    """
+    def __init__(self, name, definition, keys):
+        self.name = name
+        self.definition = definition
+        self.keys = keys
+
+    def apply_fields(self, fields):
+        def replace(match):
+            key = match.group(1)
+            return self.keys[key].str_from_value(fields[key])
+        return os.path.join("/projects/demo", re.sub(r"\{([^}]+)\}", replace, self.definition))
+
+def legacy_name(template, path, fields, strip_artist):
+    """
+    The previous approach, as it was in app.py
+    """
+    fields = fields.copy()
+    template_name, _ = os.path.splitext(os.path.basename(template.definition))
+    name, _ = os.path.splitext(os.path.basename(path))
+    if "{version}" in template_name:
+        version_key = template.keys["version"]
+        dummy_version = 9876
+        while True:
+            test_str = version_key.str_from_value(dummy_version)
+            if test_str not in name:
+                break
+            dummy_version += 1
+
+        fields["version"] = dummy_version
+        path = template.apply_fields(fields)
+        name, _ = os.path.splitext(os.path.basename(path))
+
+        dummy_version_str = version_key.str_from_value(dummy_version)
+        v_pos = name.find(dummy_version_str)
+        pre_v_str = name[:v_pos].rstrip("v")
+        post_v_str = name[v_pos + len(dummy_version_str):]
+        if (pre_v_str and post_v_str
+            and pre_v_str[-1] in DELIMITERS
+            and post_v_str[0] in DELIMITERS):
+            post_v_str = post_v_str.lstrip(DELIMITERS)
+
+        versionless_name = (pre_v_str + post_v_str).strip(DELIMITERS)
+        if versionless_name:
+            name = versionless_name
+        else:
+            new_version_str = "#" * len(version_key.str_from_value(0))
+            name = name.replace(dummy_version_str, new_version_str)
+
+    if strip_artist and "{artist}" in template_name:
+        artist = fields["artist"]
+        a_pos = name.find(artist)
+        pre_a_str = name[:a_pos]
+        post_a_str = name[a_pos + len(artist):]
+        if (pre_a_str and post_a_str
+            and pre_a_str[-1] in DELIMITERS
+            and post_a_str[0] in DELIMITERS):
+            post_a_str = post_a_str.lstrip(DELIMITERS)
+        artistless_name = (pre_a_str + post_a_str).strip(DELIMITERS)
+        name = artistless_name if artistless_name else name.replace(artist, "artist")
+
+    return name
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--names", type=int, default=20000, help="Number of names to work out per template")
+    args = parser.parse_args()
+
+    publish_name = import_app_module("publish_name")
+
+    keys = {"Shot": StringKey(), "Step": StringKey(), "name": StringKey(),
+            "artist": StringKey(), "version": IntegerKey(), "SEQ": StringKey()}
+    templates = [
+        Template("shot_publish", "{Shot}/{Step}/publish/{Shot}_{Step}_{name}_v{version}.aep", keys),
+        Template("shot_render", "{Shot}/{Step}/renders/v{version}/{Shot}_{name}_{artist}.v{version}.{SEQ}.exr", keys),
+        Template("version_only", "{Shot}/{Step}/publish/v{version}.mov", keys),
+    ]
+    fields = [{"Shot": "sh%03d" % (i % 200), "Step": "comp", "name": "main",
+               "artist": "jdoe", "version": i % 90 + 1, "SEQ": "%04d"}
+              for i in range(args.names)]
+
+    for strip_artist in (False, True):
+        strip_keys = ("version", "artist") if strip_artist else ("version",)
+        for template in templates:
+            work = [(template.apply_fields(f), f) for f in fields]
+
+            old_seconds, old_result = timed(
+                lambda: [legacy_name(template, path, f, strip_artist) for path, f in work])
+
+            def formatted():
+                formatter = publish_name.PublishNameFormatter(template, strip_keys)
+                return [formatter.format(f, path) for path, f in work]
+            new_seconds, new_result = timed(formatted)
+
+            print("%-14s %-18s legacy %7.3f s  formatter %7.3f s  (%.1fx)  e.g. %s" % (
+                template.name, "+".join(strip_keys), old_seconds, new_seconds,
+                old_seconds / max(new_seconds, 1e-9), new_result[0]))
+
+            if old_result != new_result:
+                raise RuntimeError("Names differ for %s" % template.name)
+
+if __name__ == "__main__":
+    main()
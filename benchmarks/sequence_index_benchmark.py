@@ -0,0 +1,79 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Compare finding the sequence of a number of files by filtering the folder
+listing for each of them against building a single SequenceIndex:
+
+    python benchmarks/sequence_index_benchmark.py --files 100000 --sequences 50
+"""
+
+import os
+import argparse
+from string import digits
+
+from bench_util import import_app_module, timed
+
+def prefix_match(folder, file_names, paths):
+    """
+    The previous approach - filter the folder listing with the prefix
+    of each path, then let pyseq parse the matches if it's installed
+    """
+    try:
+        import pyseq
+    except ImportError:
+        pyseq = None
+
+    results = []
+    for path in paths:
+        filename_noext, ext = os.path.splitext(os.path.basename(path))
+        filename_nodigits = filename_noext.rstrip(digits)
+        elements = [
+            os.path.join(folder, f)
+            for f in file_names
+            if f.startswith(filename_nodigits) and
+               f.endswith(ext) and
+               f[len(filename_nodigits):-len(ext) if ext else -1].isdigit()]
+        if pyseq:
+            pyseq.get_sequences(elements)
+        results.append(elements)
+    return results
+
+def index_lookup(sequence_index, folder, file_names, paths):
+    index = sequence_index.SequenceIndex.from_folder(folder, file_names)
+    return [index.find(path).paths() for path in paths]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=100000, help="Number of file names in the folder")
+    parser.add_argument("--sequences", type=int, default=50, help="Number of sequences the files are split over")
+    parser.add_argument("--lookups", type=int, default=20, help="Number of paths to look up")
+    args = parser.parse_args()
+
+    sequence_index = import_app_module("sequence_index")
+
+    folder = "/renders/shot_010"
+    frames = args.files // args.sequences
+    file_names = ["layer%03d_beauty.%04d.exr" % (seq, frame)
+                  for seq in range(args.sequences) for frame in range(1, frames + 1)]
+    step = max(1, len(file_names) // args.lookups)
+    paths = [os.path.join(folder, name) for name in file_names[::step]]
+
+    print("%d files, %d sequences, %d lookups" % (len(file_names), args.sequences, len(paths)))
+    old_seconds, old_result = timed(prefix_match, folder, file_names, paths)
+    print("%-14s %10.3f s" % ("prefix match", old_seconds))
+    new_seconds, new_result = timed(index_lookup, sequence_index, folder, file_names, paths)
+    print("%-14s %10.3f s" % ("index", new_seconds))
+
+    if [sorted(r) for r in old_result] != [sorted(r) for r in new_result]:
+        raise RuntimeError("Results differ between the two approaches")
+
+if __name__ == "__main__":
+    main()
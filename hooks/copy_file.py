@@ -10,7 +10,6 @@
 
 import tank
 from tank import Hook
-import shutil
 import os
 
 class CopyFile(Hook):
@@ -60,4 +59,4 @@ class CopyFile(Hook):
             os.makedirs(dirname, 0777)
             os.umask(old_umask)            
 
-        shutil.copy(source_path, target_path)
\ No newline at end of file
+        self.parent.transfer_file(source_path, target_path)
\ No newline at end of file
@@ -0,0 +1,52 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+# 
+# CONFIDENTIAL AND PROPRIETARY
+# 
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit 
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your 
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights 
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import tank
+from tank import Hook
+
+class CopyFiles(Hook):
+    """
+    Hook called when a list of files needs to be copied
+    """
+    
+    # values of the 'hook_copy_file' setting that point at the
+    # default copy file hook shipped with the app
+    DEFAULT_COPY_FILE_HOOKS = ["default", "copy_file", "{self}/copy_file.py"]
+    
+    def execute(self, pairs, task, progress_cb, **kwargs):
+        """
+        Main hook entry point
+        
+        :param pairs:       List
+                            A list of (source_path, target_path) tuples to copy
+                        
+        :param task:        Dictionary
+                            The publish task that these files are being copied for.  See
+                            the copy_file hook for a description of the contents.
+                        
+        :param progress_cb: Function
+                            Optional callback to report progress.  Call:
+                            
+                                progress_cb(completed, total)
+                                
+                            as files finish copying
+        
+        :returns:           List
+                            A list of (source_path, target_path, error) tuples for any
+                            files that failed to copy
+        """
+        if self.parent.get_setting("hook_copy_file") not in CopyFiles.DEFAULT_COPY_FILE_HOOKS:
+            # the per-file hook has been customised so keep using it
+            # for every file:
+            return self.parent.copy_file_sequence(pairs, task, progress_cb)
+        
+        # stream the whole list through the copy threads without
+        # dispatching a hook for each file:
+        return self.parent.copy_file_sequence(pairs, task, progress_cb, copy_fn=self.parent.transfer_file)
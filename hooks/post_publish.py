@@ -77,10 +77,8 @@ class PostPublishHook(Hook):
         """
         Find the next available version for the specified work_file
         """
-        existing_versions = self.parent.tank.paths_from_template(work_template, fields, ["version"])
-        version_numbers = [work_template.get_fields(v).get("version") for v in existing_versions]
         curr_v_no = fields["version"]
-        max_v_no = max(version_numbers)
+        max_v_no = self.parent.find_highest_version(work_template, fields)
         return max(curr_v_no, max_v_no) + 1
 
 
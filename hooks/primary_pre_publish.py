@@ -117,13 +117,13 @@ class PrimaryPrePublishHook(Hook):
         
         progress_cb(25, "Validating work file")
         
-        if not work_template.validate(path):
+        if not self.parent.template_cache.validate(work_template, path):
             raise TankError("File '%s' is not a valid work path, unable to publish!" % path)
         
         progress_cb(50, "Validating publish path")
         
         # find the publish path:
-        fields = work_template.get_fields(path)
+        fields = self.parent.template_cache.get_fields(work_template, path)
         fields["TankType"] = output["tank_type"]
         publish_template = output["publish_template"]
         publish_path = publish_template.apply_fields(fields) 
@@ -135,10 +135,8 @@ class PrimaryPrePublishHook(Hook):
         
         # check the version number against existing work file versions to avoid accidentally
         # bypassing more recent work!
-        existing_versions = self.parent.tank.paths_from_template(work_template, fields, ["version"])
-        version_numbers = [ work_template.get_fields(v).get("version") for v in existing_versions]
         curr_v_no = fields["version"]
-        max_v_no = max(version_numbers)
+        max_v_no = self.parent.find_highest_version(work_template, fields)
         if max_v_no > curr_v_no:
             # there is a higher version number - this means that someone is working
             # on an old version of the file. Warn them about upgrading.
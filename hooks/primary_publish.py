@@ -125,7 +125,7 @@ class PrimaryPublishHook(Hook):
             scene_path = task['item']['other_params']['source']
             publish_path = task['item']['other_params']['destination']
             publish_template = task["output"]["publish_template"]
-            fields = publish_template.get_fields(publish_path)
+            fields = self.parent.template_cache.get_fields(publish_template, publish_path)
 
             # copy the file:
             progress_cb(50.0, "Copying the file")
@@ -153,7 +153,7 @@ class PrimaryPublishHook(Hook):
             
             progress_cb(100)
         except:
-            QtGui.QMessageBox.warning(None, "Runtime Error!", traceback.format_exc())
+            self.parent.report_exception("Runtime Error!")
         
         return publish_path
 
@@ -170,64 +170,13 @@ class PrimaryPublishHook(Hook):
         this will return a 'versionless' name
         """
         # first, extract the fields from the path using the template:
-        fields = fields.copy() if fields else template.get_fields(path)
+        fields = fields or self.parent.template_cache.get_fields(template, path)
         if "name" in fields and fields["name"]:
             # well, that was easy!
-            name = fields["name"]
-        else:
-            # find out if version is used in the file name:
-            template_name, _ = os.path.splitext(os.path.basename(template.definition))
-            version_in_name = "{version}" in template_name
-        
-            # extract the file name from the path:
-            name, _ = os.path.splitext(os.path.basename(path))
-            delims_str = "_-. "
-            if version_in_name:
-                # looks like version is part of the file name so we        
-                # need to isolate it so that we can remove it safely.  
-                # First, find a dummy version whose string representation
-                # doesn't exist in the name string
-                version_key = template.keys["version"]
-                dummy_version = 9876
-                while True:
-                    test_str = version_key.str_from_value(dummy_version)
-                    if test_str not in name:
-                        break
-                    dummy_version += 1
-                
-                # now use this dummy version and rebuild the path
-                fields["version"] = dummy_version
-                path = template.apply_fields(fields)
-                name, _ = os.path.splitext(os.path.basename(path))
-                
-                # we can now locate the version in the name and remove it
-                dummy_version_str = version_key.str_from_value(dummy_version)
-                
-                v_pos = name.find(dummy_version_str)
-                # remove any preceeding 'v'
-                pre_v_str = name[:v_pos].rstrip("v")
-                post_v_str = name[v_pos + len(dummy_version_str):]
-                
-                if (pre_v_str and post_v_str 
-                    and pre_v_str[-1] in delims_str 
-                    and post_v_str[0] in delims_str):
-                    # only want one delimiter - strip the second one:
-                    post_v_str = post_v_str.lstrip(delims_str)
+            return fields["name"]
 
-                versionless_name = pre_v_str + post_v_str
-                versionless_name = versionless_name.strip(delims_str)
-                
-                if versionless_name:
-                    # great - lets use this!
-                    name = versionless_name
-                else: 
-                    # likely that version is only thing in the name so 
-                    # instead, replace the dummy version with #'s:
-                    zero_version_str = version_key.str_from_value(0)        
-                    new_version_str = "#" * len(zero_version_str)
-                    name = name.replace(dummy_version_str, new_version_str)
-        
-        return name     
+        formatter = self.parent.get_publish_name_formatter(template, strip_keys=("version",))
+        return formatter.format(fields, path)
      
 
     def _register_publish(self, path, name, sg_task, publish_version, tank_type, comment, thumbnail_path, dependency_paths):
@@ -243,7 +192,6 @@ class PrimaryPublishHook(Hook):
             "path": path,
             "name": name,
             "version_number": publish_version,
-            "thumbnail_path": thumbnail_path,
             "task": sg_task,
             "dependency_paths": dependency_paths,
             "published_file_type":tank_type,
@@ -253,5 +201,9 @@ class PrimaryPublishHook(Hook):
         
         # register publish;
         sg_data = tank.util.register_publish(**args)
+
+        # upload the thumbnail once so the secondary publishes can share it:
+        if thumbnail_path:
+            self.parent.share_thumbnail([sg_data], thumbnail_path)
         
         return sg_data
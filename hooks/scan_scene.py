@@ -10,15 +10,11 @@
 
 import os
 import re
-import pyseq
 import traceback
 
 import sgtk
 from sgtk import Hook
 from sgtk import TankError
-from tank.platform.qt import QtCore, QtGui
-
-import xml.etree.ElementTree as ET
 
 
 class ScanSceneHook(Hook):
@@ -71,7 +67,7 @@ class ScanSceneHook(Hook):
             if self.parent.initialized_from == "primary":
                 self.parent.context_fields = self.process_fields(input_dict)
 
-            scene_path = input_dict['output'].publish_template.apply_fields(self.parent.context_fields)
+            scene_path = self.parent.template_cache.apply_fields(input_dict['output'].publish_template, self.parent.context_fields)
             items.append({"type": "work_file",
                           "name": os.path.basename(scene_path),
                           'other_params': {'source': input_dict['path'],
@@ -97,11 +93,20 @@ class ScanSceneHook(Hook):
                     if input_dict['class'] == 'single' and extension.lower() == '.aepx':
 
                         #<AfterEffectsProject xmlns="http://www.adobe.com/products/aftereffects" majorVersion="1" minorVersion="0">
-                        ET.register_namespace('', "http://www.adobe.com/products/aftereffects")
-                        after_tree = ET.parse(input_dict['path'])
+                        #the project is streamed so only its references are kept in memory
+                        after_project = self.parent.read_aepx(input_dict['path'])
 
                         #first process itput references
-                        references = self.after_recurse_get_fileReference(after_tree.getroot())
+                        references = list(after_project.file_references())
+
+                        #look up all the references in shotgun with a single query
+                        lookup_paths = []
+                        for ref in references:
+                            if ref['filetype'] != 'fffffffe':
+                                lookup_paths.append(ref['fullpath'])
+                            elif os.path.exists(ref['fullpath']):
+                                lookup_paths.extend(seq.format_path() for seq in self.parent.detect_folder_sequences(ref['fullpath']) if len(seq) > 1)
+                        published = self.parent.find_publishes(lookup_paths)
 
                         #store a dictionary for each reference file with source and publish paths to later replace it in the xml file
                         references_dict = {}
@@ -119,9 +124,9 @@ class ScanSceneHook(Hook):
 
                                 if ref['filetype'] != 'fffffffe':
                                     #The input reference its not an image sequence (folder)
-                                    self.parent.log_debug(sgtk.util.find_publish(self.parent.sgtk, [ref['fullpath']]))
+                                    self.parent.log_debug(published.get(ref['fullpath']))
 
-                                    if not sgtk.util.find_publish(self.parent.sgtk, [ref['fullpath']]):
+                                    if not published.get(ref['fullpath']):
 
                                         name, ext = os.path.splitext(os.path.basename(ref['fullpath']))
                                         ref_name = self.beautify_name(name)
@@ -147,17 +152,17 @@ class ScanSceneHook(Hook):
                                     #The input reference its an image sequence (folder)
                                     if os.path.exists(ref['fullpath']):
 
-                                        sequences = pyseq.get_sequences(ref['fullpath'])
+                                        sequences = self.parent.detect_folder_sequences(ref['fullpath'])
 
                                         if len(sequences) != 0:
                                             for seq in sequences:
-                                                seq_format = os.path.join(os.path.dirname(seq.path()), seq.format("%h%p%t"))
+                                                seq_format = seq.format_path()
 
                                                 #validate if exclusively corresponds to a padded sequence
 
-                                                if "%" in seq_format:
+                                                if len(seq) > 1:
 
-                                                    if not sgtk.util.find_publish(self.parent.sgtk, [seq_format]):
+                                                    if not published.get(seq_format):
 
                                                         #Its complex to provide an ideal way to store this files
                                                         self.parent.log_debug(seq_format)
@@ -166,11 +171,11 @@ class ScanSceneHook(Hook):
 
                         #add xml project item
                         after_xml_template = self.parent.sgtk.templates['after_shot_xml_project_pub']
-                        publish_path = after_xml_template.apply_fields(self.parent.context_fields)
+                        publish_path = self.parent.template_cache.apply_fields(after_xml_template, self.parent.context_fields)
                         items.append({"type": "aftereffects_xmlproject",
                                       "name": "%s (%s)" % (os.path.basename(input_dict['path']), os.path.basename(publish_path)),
                                       "other_params": {'item_dict': input_dict,
-                                                       'xml_tree': after_tree,
+                                                       'xml_root_tag': after_project.root_tag,
                                                        'references_dict': references_dict,
                                                        'fields': self.parent.context_fields,
                                                        'publish_path': publish_path,
@@ -197,16 +202,16 @@ class ScanSceneHook(Hook):
                         cinema_publish_render_template = self.parent.sgtk.templates['max_shot_render_publish_exr']
                         cinema_publish_preview_template = self.parent.sgtk.templates['max_shot_render_publish_mov']
 
-                        if cinema_work_render_template.validate(input_dict['path']):
+                        if self.parent.template_cache.validate(cinema_work_render_template, input_dict['path']):
 
-                            work_fields = cinema_work_render_template.get_fields(input_dict['path'])                            
+                            work_fields = self.parent.template_cache.get_fields(cinema_work_render_template, input_dict['path'])                            
                             all_fields = self.complete_fields(input_dict['path'], work_fields, cinema_publish_render_template)                            
 
                             #only save the item if the user fill all the missing keys
                             if all_fields:
 
                                 #append render sequence item
-                                publish_path = cinema_publish_render_template.apply_fields(all_fields)
+                                publish_path = self.parent.template_cache.apply_fields(cinema_publish_render_template, all_fields)
                                 items.append({"type": "cinema_render_sequences",
                                               "name": "%s (%s)" % (os.path.basename(input_dict['path']), os.path.basename(publish_path)),
                                               "other_params": {'item_dict': input_dict,
@@ -216,7 +221,7 @@ class ScanSceneHook(Hook):
                                                                'publish_template': cinema_publish_render_template}})
 
                                 #append render preview item
-                                preview_path = cinema_publish_preview_template.apply_fields(all_fields)
+                                preview_path = self.parent.template_cache.apply_fields(cinema_publish_preview_template, all_fields)
                                 #override input dict path to reflect the published one
                                 preview_input_dict = dict(input_dict)
                                 preview_input_dict['path'] = publish_path
@@ -235,16 +240,16 @@ class ScanSceneHook(Hook):
                         after_publish_render_template = self.parent.sgtk.templates['after_shot_render_pub_exr']
                         after_publish_preview_template = self.parent.sgtk.templates['after_shot_render_pub_preview']
 
-                        if after_work_render_template.validate(input_dict['path']):
+                        if self.parent.template_cache.validate(after_work_render_template, input_dict['path']):
 
-                            work_fields = after_work_render_template.get_fields(input_dict['path'])                            
+                            work_fields = self.parent.template_cache.get_fields(after_work_render_template, input_dict['path'])                            
                             all_fields = self.complete_fields(input_dict['path'], work_fields, after_publish_render_template)                            
 
                             #only save the item if the user fill all the missing keys
                             if all_fields:
 
                                 #append render sequence item
-                                publish_path = after_publish_render_template.apply_fields(all_fields)
+                                publish_path = self.parent.template_cache.apply_fields(after_publish_render_template, all_fields)
                                 items.append({"type": "after_render_sequences",
                                               "name": "%s (%s)" % (os.path.basename(input_dict['path']), os.path.basename(publish_path)),
                                               "other_params": {'item_dict': input_dict,
@@ -254,7 +259,7 @@ class ScanSceneHook(Hook):
                                                                'publish_template': after_publish_render_template}})
 
                                 #append render preview item
-                                preview_path = after_publish_preview_template.apply_fields(all_fields)
+                                preview_path = self.parent.template_cache.apply_fields(after_publish_preview_template, all_fields)
                                 #override input dict path to reflect the published one
                                 preview_input_dict = dict(input_dict)
                                 preview_input_dict['path'] = publish_path
@@ -313,8 +318,8 @@ class ScanSceneHook(Hook):
 
                 else:
                     message = 'Enter the %s token for your published files:\n%s\n' % (key, input_path)
-                    field_input, responce = QtGui.QInputDialog.getText(None, 'Complete Fields', message)
-                    if responce:
+                    field_input = self.parent.ask_for_field(key, 'Complete Fields', message)
+                    if field_input is not None:
                         all_fields[key] = field_input.replace(' ', '').replace('-', '').replace('_', '').lower()
                     else:
                         return None
@@ -328,11 +333,11 @@ class ScanSceneHook(Hook):
         fields = self.parent.context.as_template_fields(input_dict['output'].publish_template, self.parent.context)
 
         if 'name' in input_dict['output'].publish_template.keys:
-            name_input, responce = QtGui.QInputDialog.getText(None, 'Publish Name', 'Enter the name token for your published files:', text=u'master')
-            if responce:
+            name_input = self.parent.ask_for_field('name', 'Publish Name', 'Enter the name token for your published files:', default=u'master')
+            if name_input is not None:
                 fields['name'] = name_input.replace(' ', '').replace('-', '').replace('_', '').lower()
             else:
-                return items
+                raise TankError("A name is needed for the published files")
 
         if 'version' in input_dict['output'].publish_template.keys:
             version = self.compute_highest_version(self.parent.sgtk, input_dict['output'].publish_template, fields)
@@ -353,20 +358,6 @@ class ScanSceneHook(Hook):
         :param curr_fields: A complete set of fields for the template
         :returns: The highest version number found
         """
-        # set up the payload
-        output = {}
-
-        # calculate visibility
-        # check if this is the latest item
-
-        # note - have to do some tricks here to get sequences and stereo working
-        # need to fix this in Tank platform
-
-        # get all eyes, all frames and all versions
-        # potentially a HUGE glob, so may be slow...
-        # todo: better support for sequence iterations
-        #       by using the abstract iteration methods
-        
         # first, find all abstract (Sequence) keys from the template:
         abstract_keys = set()
         for key_name, key in template.keys.iteritems():
@@ -376,34 +367,6 @@ class ScanSceneHook(Hook):
         # skip keys are all abstract keys + 'version' & 'eye'
         skip_keys = [k for k in abstract_keys] + ["version", "eye"]
 
-        # then find all files, skipping these keys
-        all_versions = sgtk.paths_from_template(template, curr_fields, skip_keys=skip_keys)
-
-        # if we didn't find anything then something has gone wrong with our 
-        # logic as we should have at least one file so error out:
-        # TODO - this should be handled more cleanly!
-        if not all_versions:
-            print "Failed to find any files!"   
-        
-        # now look for the highest version number...
-        highest_version = 0
-        for ver in all_versions:
-            curr_fields = template.get_fields(ver)
-            if curr_fields["version"] > highest_version:
-                highest_version = curr_fields["version"]
-
-        return highest_version
-
-
-
-    def after_recurse_get_fileReference(self, element):
-        """
-        Method to collect all fileReference items in the xml proyect
-        """
-        for child in element.getchildren():
-
-            if 'fileReference' in child.tag:
-                yield { key: value for key, value in child.attrib.iteritems()}
-
-            for item in self.after_recurse_get_fileReference(child):
-                yield item
+        # the versions found are indexed so the disk is only
+        # scanned again when a new version may have been added:
+        return self.parent.find_highest_version(template, curr_fields, skip_keys)
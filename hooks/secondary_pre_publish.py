@@ -9,7 +9,6 @@
 # not expressly granted therein are reserved by Shotgun Software Inc.
 
 import os
-import pyseq
 
 import sgtk
 from sgtk import Hook
@@ -132,8 +131,7 @@ class PrePublishHook(Hook):
 
             self.parent.log_debug("Returning Secondary Pre Publish: %s" % results)
         except:
-            import traceback
-            QtGui.QMessageBox.warning(None, "Runtime Error!", traceback.format_exc())
+            self.parent.report_exception("Runtime Error!")
 
 
         return results
@@ -146,7 +144,7 @@ class PrePublishHook(Hook):
         errors = []
 
         schema = '<AfterEffectsProject xmlns="http://www.adobe.com/products/aftereffects" majorVersion="1" minorVersion="0">'
-        if 'http://www.adobe.com/products/aftereffects' not in str(item['other_params']['xml_tree'].getroot()):
+        if 'http://www.adobe.com/products/aftereffects' not in item['other_params']['xml_root_tag']:
 
             errors.append("The header of the project file dont match the Adobe schema (%s)" % schema)
 
@@ -174,13 +172,11 @@ class PrePublishHook(Hook):
 
         errors = []
 
-        sequence_files = self.parent.detect_image_sequence(item['other_params']['item_dict']['path'] % 1)
-        sequences = pyseq.get_sequences(sequence_files)
+        seq = self.parent.detect_sequence(item['other_params']['item_dict']['path'] % 1)
 
-        for seq in sequences:
-
-            if len(seq.missing()) != 0:
-                errors.append("Your sequence has %s missing frames, it could not be published. (%s)" % (str(len(seq.missing())), seq.missing()))
+        missing = seq.missing() if seq else None
+        if missing:
+            errors.append("Your sequence has %s missing frames, it could not be published. (%s)" % (str(len(missing)), missing))
 
 
         return errors
\ No newline at end of file
@@ -11,7 +11,6 @@
 import os
 import re
 import sys
-import pyseq
 import shutil
 import tempfile
 import traceback
@@ -103,6 +102,10 @@ class PublishHook(Hook):
         """
         results = []
 
+        # publishes are registered with Shotgun in batches once all
+        # of the tasks have been published:
+        self._registration_queue = self.parent.create_registration_queue()
+
         # publish all tasks:
         for task in tasks:
             publish_task = task
@@ -185,6 +188,21 @@ class PublishHook(Hook):
 
             progress_cb(100)
 
+        # register all the publishes:
+        def registration_progress(completed, total):
+            progress_cb(100, "Registering publishes - %s/%s" % (completed, total))
+
+        for task, error in self._registration_queue.flush(registration_progress):
+            for result in results:
+                if result["task"] is task:
+                    result["errors"].append(error)
+                    break
+            else:
+                results.append({"task": task, "errors": [error]})
+
+        # previous publish lookups are out of date now:
+        self.parent.forget_publishes()
+
         return results
 
 
@@ -223,11 +241,13 @@ class PublishHook(Hook):
 
         progress_cb(30, "Copying file to PublishArea")
 
-        self.parent.copy_file(element_path, publish_path, publish_task)
+        copy_errors = self.parent.copy_files([(element_path, publish_path)], publish_task)
+        if copy_errors:
+            raise TankError("Failed to copy %s to %s - %s" % copy_errors[0])
 
-        # register the publish:
+        # queue the publish for registration:
         publish_version = item['other_params']['fields']['version']
-        progress_cb(90, "Registering the publish")        
+        progress_cb(90, "Queueing the publish for registration")
         args = {
             "tk": self.parent.tank,
             "context": self.parent.context,
@@ -240,7 +260,7 @@ class PublishHook(Hook):
             "dependency_paths": [primary_publish_path],
             "published_file_type":tank_type
         }
-        tank.util.register_publish(**args)
+        self._registration_queue.add(publish_task, args)
 
     def __publish_after_xml_project(
         self, item, output, work_template, primary_publish_path, 
@@ -277,18 +297,15 @@ class PublishHook(Hook):
         progress_cb(30, "Copying file to PublishArea")
 
         
-        #replace all the reference paths with the publish ones
-        after_tree = item['other_params']['xml_tree']
+        #write the published project with all the reference paths replaced
+        #with the publish ones, streaming it rather than loading it in memory
         references_dict = item['other_params']['references_dict']
-        self.after_recurse_update_fileReference(after_tree.getroot(), references_dict)
-
-        #save modified xml tree
-        after_tree.write(publish_path)
+        self.parent.rewrite_aepx(item['other_params']['item_dict']['path'], publish_path, references_dict)
 
 
-        # register the publish:
+        # queue the publish for registration:
         publish_version = item['other_params']['fields']['version']
-        progress_cb(90, "Registering the publish")        
+        progress_cb(90, "Queueing the publish for registration")
         args = {
             "tk": self.parent.tank,
             "context": self.parent.context,
@@ -301,7 +318,7 @@ class PublishHook(Hook):
             "dependency_paths": [primary_publish_path],
             "published_file_type":tank_type
         }
-        tank.util.register_publish(**args)
+        self._registration_queue.add(publish_task, args)
 
 
     def __publish_render_sequences(
@@ -326,7 +343,6 @@ class PublishHook(Hook):
         # get the current scene path and extract fields from it
         # using the work template:
         sequence_path = item['other_params']['item_dict']['path']
-        sequence_files = self.parent.detect_image_sequence(sequence_path % 1)
         tank_type = output["tank_type"]
         
         work_template = item['other_params']['work_template']
@@ -341,26 +357,35 @@ class PublishHook(Hook):
         publish_name = self.parent._get_publish_name(publish_path, publish_template)
         base_message = "Copying sequence to PublishArea"
         progress_cb(30, base_message)
-        sequence_elements = sorted(self.parent.detect_image_sequence(sequence_path % 1))
+        sequence = self.parent.detect_sequence(sequence_path % 1)
+        if not sequence:
+            raise TankError("Couldn't find any frames for the sequence %s" % sequence_path)
 
-        current_progress = 30
-        item_progress = 60.0 / len(sequence_elements)
-        for work_element_path in sequence_elements:
+        frames = [(frame, work_element_path, publish_path % frame)
+                  for frame, work_element_path in sequence.iter_frames()]
 
-            current_progress += item_progress
-            fields = work_template.get_fields(work_element_path)
-            padding = fields['SEQ']
+        # only copy the frames that changed since the previous published version,
+        # the paths are built as they are needed as the search stops at the
+        # first version that was published:
+        publish_fields = dict(item['other_params']['fields'])
+        def previous_publish_paths():
+            for version in range(publish_fields['version'] - 1, 0, -1):
+                yield publish_template.apply_fields(dict(publish_fields, version=version))
 
-            progress_cb(current_progress, "%s - %s" % (base_message, padding))
+        def copy_progress(completed, total):
+            progress_cb(30 + (60.0 * completed) / total, "%s - %s/%s" % (base_message, completed, total))
 
-            publish_element_path = publish_path % padding
+        copy_errors = self.parent.copy_sequence_delta(
+            frames, publish_task, publish_path, previous_publish_paths(), copy_progress)
+        if copy_errors:
+            raise TankError("Failed to copy %d of %d frames to the publish area:\n%s"
+                            % (len(copy_errors), len(frames),
+                               "\n".join("%s -> %s: %s" % error for error in copy_errors)))
 
-            self.parent.copy_file(work_element_path, publish_element_path, publish_task)
 
-
-        # register the publish:
+        # queue the publish for registration:
         publish_version = item['other_params']['fields']['version']
-        progress_cb(90, "Registering the publish")        
+        progress_cb(90, "Queueing the publish for registration")
         args = {
             "tk": self.parent.tank,
             "context": self.parent.context,
@@ -373,7 +398,7 @@ class PublishHook(Hook):
             "dependency_paths": [primary_publish_path],
             "published_file_type":tank_type
         }
-        tank.util.register_publish(**args)
+        self._registration_queue.add(publish_task, args)
 
 
     def __publish_preview_video(
@@ -397,8 +422,9 @@ class PublishHook(Hook):
 
         try:
             sequence_path = item['other_params']['item_dict']['path']
-            sequence_elements = sorted(self.parent.detect_image_sequence(sequence_path % 1))
-            sequence = pyseq.Sequence(sequence_elements)
+            sequence = self.parent.detect_sequence(sequence_path % 1)
+            if not sequence:
+                raise TankError("Couldn't find any frames for the sequence %s" % sequence_path)
 
             frames_length = sequence.length()
             image_start_number = sequence.start()
@@ -425,47 +451,102 @@ class PublishHook(Hook):
             temporal_file = os.path.join(temporal_path, 'temporal_video.mov')
 
             input_frame_rate = 24
-
-            progress_cb(40, "Transcoding renders to sRGB")
-            temp_path = self.set_temporal_transcoding(sequence_path).replace('.exr', '.jpg')
-            self.parent.log_debug("Temporal transcoding path: %s" % temp_path)
-
-            progress_cb(60, "Transcoding renders into video")
-            convert_cmd = ['ffmpeg',
-                         '-r',
-                         str(input_frame_rate),
-                         '-i',
-                         temp_path,
-                         '-vcodec',
-                         'libx264',
-                         '-pix_fmt',
-                         'yuv420p',
-                         '-preset',
-                         'slow',
-                         '-crf',
-                         '5',
-                         '-vf',
-                         'scale=trunc(iw/2)*2:trunc(ih/2)*2,setsar=1/1',
-                         '-y',
-                         '-r',
-                         '24',
-                         temporal_file]
-
-
-            self.parent.log_debug ("convert_cmd created as: %s" % convert_cmd)
-            preview_video = subprocess.Popen(convert_cmd, startupinfo = subprocess.STARTUPINFO(), stdout=subprocess.PIPE, stderr=subprocess.PIPE, stdin=subprocess.PIPE)
-            self.parent.log_debug ("doing playblast command")
-            stdout, stderr = preview_video.communicate()
-            self.parent.log_debug ("ffmpeg thingy done")
-
-            if preview_video.returncode != 0:
-                raise Exception("Failed to convert playblast to video: %s" % (str(stderr) + '\n' + str(stdout) + '\n' + str(convert_cmd)))
+            temp_path = None
+
+            # reuse the movie from a previous publish of the same frames:
+            progress_cb(35, "Checking the preview cache")
+            preview_settings = {"frame_rate": input_frame_rate,
+                                "preview_mode": output.get("preview_mode", "streaming"),
+                                "preview_preset": output.get("preview_preset", "slow"),
+                                "preview_chunk_size": output.get("preview_chunk_size", 0)}
+            cache_key = self.parent.preview_cache_key(sequence, preview_settings,
+                                                      output.get("copy_threads", 4))
+            cached_preview = self.parent.get_cached_preview(cache_key)
+
+            if cached_preview:
+                self.parent.log_debug("Using cached preview movie: %s" % cached_preview)
+                shutil.copy(cached_preview, temporal_file)
+            elif output.get("preview_mode", "streaming") == "streaming":
+                # decode the frames straight into a single ffmpeg process:
+                def encode_progress(completed, total):
+                    progress_cb(40 + (40.0 * completed) / total, "Encoding renders into video - %s/%s" % (completed, total))
+
+                progress_cb(40, "Encoding renders into video")
+                self.parent.encode_preview(sequence, temporal_file, input_frame_rate, encode_progress,
+                                           output.get("preview_preset", "slow"),
+                                           output.get("preview_chunk_size", 0))
+            else:
+                def transcode_progress(completed, total):
+                    progress_cb(40 + (20.0 * completed) / total, "Transcoding renders to sRGB - %s/%s" % (completed, total))
+
+                progress_cb(40, "Transcoding renders to sRGB")
+                temp_path = self.set_temporal_transcoding(sequence_path, transcode_progress).replace('.exr', '.jpg')
+                self.parent.log_debug("Temporal transcoding path: %s" % temp_path)
+
+                progress_cb(60, "Transcoding renders into video")
+                convert_cmd = ['ffmpeg',
+                             '-r',
+                             str(input_frame_rate),
+                             '-i',
+                             temp_path,
+                             '-vcodec',
+                             'libx264',
+                             '-pix_fmt',
+                             'yuv420p',
+                             '-preset',
+                             output.get("preview_preset", "slow"),
+                             '-crf',
+                             '5',
+                             '-vf',
+                             'scale=trunc(iw/2)*2:trunc(ih/2)*2,setsar=1/1',
+                             '-y',
+                             '-r',
+                             '24',
+                             temporal_file]
+
+
+                self.parent.log_debug ("convert_cmd created as: %s" % convert_cmd)
+                preview_video = subprocess.Popen(convert_cmd, startupinfo = subprocess.STARTUPINFO(), stdout=subprocess.PIPE, stderr=subprocess.PIPE, stdin=subprocess.PIPE)
+                self.parent.log_debug ("doing playblast command")
+                stdout, stderr = preview_video.communicate()
+                self.parent.log_debug ("ffmpeg thingy done")
+
+                if preview_video.returncode != 0:
+                    raise Exception("Failed to convert playblast to video: %s" % (str(stderr) + '\n' + str(stdout) + '\n' + str(convert_cmd)))
+
+            if not cached_preview:
+                self.parent.cache_preview(cache_key, temporal_file)
 
             shutil.move(temporal_file, publish_path)
 
 
-            # register the publish:
-            progress_cb(80, "Registering the publish")        
+            try:
+                if temp_path and os.path.exists(temp_path):
+                    shutil.rmtree(temp_path)
+            except:
+                pass
+
+            def submit_preview(sg_publishes):
+                """
+                Create the Shotgun Version for the preview once the
+                publish has been registered
+                """
+                sg_version = self.submit_version(sequence_path, 
+                                                  publish_path,
+                                                  [sg_publishes], 
+                                                  sg_task, 
+                                                  comment, 
+                                                  True,
+                                                  image_start_number, 
+                                                  image_end_number)
+
+                # upload the movie in the background so the publish doesn't
+                # have to wait for it:
+                self.parent.queue_upload("Version", sg_version["id"], publish_path,
+                                         "sg_uploaded_movie", thumbnail_path)
+
+            # queue the publish for registration:
+            progress_cb(90, "Queueing the publish for registration")
             args = {
                 "tk": self.parent.tank,
                 "context": self.parent.context,
@@ -478,34 +559,7 @@ class PublishHook(Hook):
                 "dependency_paths": [primary_publish_path],
                 "published_file_type":tank_type
             }
-            sg_publishes = tank.util.register_publish(**args)
-
-
-            #creating SHotgun Version
-            progress_cb(90, "Creating Shotgun Version")
-            sg_version = self.submit_version(sequence_path, 
-                                              publish_path,
-                                              [sg_publishes], 
-                                              sg_task, 
-                                              comment, 
-                                              True,
-                                              image_start_number, 
-                                              image_end_number)
-
-            # Upload in a new thread and make our own event loop to wait for the
-            # thread to finish.
-            progress_cb(95, "Uploading to Shotgun")
-            event_loop = QtCore.QEventLoop()
-            thread = UploaderThread(self.parent, sg_version, publish_path, thumbnail_path, True)
-            thread.finished.connect(event_loop.quit)
-            thread.start()
-            event_loop.exec_()
-
-            try:
-                if os.path.exists(temp_path):
-                    shutil.rmtree(temp_path)
-            except:
-                pass
+            self._registration_queue.add(publish_task, args, submit_preview)
 
             progress_cb(100, "Done") 
         except:
@@ -515,56 +569,49 @@ class PublishHook(Hook):
 
 
 
-    def set_temporal_transcoding(self, preview_temp):
+    def set_temporal_transcoding(self, preview_temp, progress_cb=None):
 
         """
-        Method to transcode the exr sequence into a sRGB jpg one
+        Method to transcode the exr sequence into a sRGB jpg one.  Frames
+        are converted in parallel, one ImageMagick process per core.
+
+        :param preview_temp:    The path of the exr sequence, e.g. /path/to/render.%04d.exr
+        :param progress_cb:     Optional function called as progress_cb(completed, total)
+                                as frames are converted
         """
 
         tmp_transcode_dir = tempfile.gettempdir()
 
         filename, ext = os.path.splitext(os.path.basename(preview_temp))
         filename, padding = os.path.splitext(filename)
-        folderfiles = os.listdir(os.path.dirname(preview_temp))
-
-        sequence_files = []
-        for file in sorted(folderfiles):
-            if file.startswith(filename) and file.endswith(ext):
-                sequence_files.append(file)
+        sequence = self.parent.detect_sequence(preview_temp % 1)
 
         if not os.path.exists(tmp_transcode_dir):
             os.makedirs(tmp_transcode_dir)
 
-        current = 1
-        for i in sequence_files:
-            from_source = os.path.dirname(preview_temp) + os.path.sep + i
+        imagemagick = self.get_imagemagick()
+        convert_cmds = []
+        # output frames are numbered from 1 in the order of the sequence
+        # regardless of the order the conversions finish in:
+        for current, from_source in enumerate(sequence.iter_paths(), 1):
             to_dest = tmp_transcode_dir + (filename + padding + ".jpg") % current
 
-            convert_cmd = [self.get_imagemagick(),
-                           from_source,
-                           '-set',
-                           '-colorspace',
-                           'RGB',
-                           '-colorspace',
-                           'sRGB',
-                           to_dest]
-
-            CREATE_NO_WINDOW = 0x08000000
-            startupinfo = subprocess.STARTUPINFO()
-            startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-            linear_to_srgb = subprocess.Popen(convert_cmd,
-                                              startupinfo = startupinfo,
-                                              stdout=subprocess.PIPE,
-                                              stderr=subprocess.PIPE,
-                                              stdin=subprocess.PIPE,
-                                              creationflags=CREATE_NO_WINDOW)
-            stdout, stderr = linear_to_srgb.communicate()
-
-            if linear_to_srgb.returncode != 0:
-                raise Exception(str(stderr) + '\n' + str(stdout))
-
-            current += 1
-
+            convert_cmds.append([imagemagick,
+                                 from_source,
+                                 '-set',
+                                 '-colorspace',
+                                 'RGB',
+                                 '-colorspace',
+                                 'sRGB',
+                                 to_dest])
+
+        CREATE_NO_WINDOW = 0x08000000
+        startupinfo = subprocess.STARTUPINFO()
+        startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+        self.parent.run_commands(convert_cmds, progress_cb,
+                                 {"startupinfo": startupinfo, "creationflags": CREATE_NO_WINDOW})
+
+        current = len(convert_cmds) + 1
         to_dest_2 = tmp_transcode_dir + (filename + padding + '.jpg') % current
         shutil.copy(to_dest, to_dest_2)
 
@@ -594,21 +641,6 @@ class PublishHook(Hook):
 
         return path
 
-    def after_recurse_update_fileReference(self, element, references_dict):
-        """
-        Method to collect all fileReference items in the xml project
-        """
-        for child in element.getchildren():
-
-            if 'fileReference' in child.tag:
-                reference = { key: value for key, value in child.attrib.iteritems()}
-                if reference['fullpath'] in references_dict:
-                    child.attrib['fullpath'] = references_dict[reference['fullpath']]
-
-            self.after_recurse_update_fileReference(child, references_dict)
-
-
-
     def submit_version(self, path_to_frames, path_to_movie, sg_publishes,
                         sg_task, comment, store_on_disk, first_frame, last_frame, override_entity=False):
         """
@@ -666,45 +698,3 @@ class PublishHook(Hook):
         sg_version = self.parent.tank.shotgun.create("Version", data)
         self.parent.log_debug("Created version in shotgun: %s" % str(data))
         return sg_version
-
-
-
-class UploaderThread(QtCore.QThread):
-    """
-    Simple worker thread that encapsulates uploading to shotgun.
-    Broken out of the main loop so that the UI can remain responsive
-    even though an upload is happening
-    """
-    def __init__(self, app, version, path_to_movie, thumbnail_path, upload_to_shotgun):
-        QtCore.QThread.__init__(self)
-        self._app = app
-        self._version = version
-        self._path_to_movie = path_to_movie
-        self._thumbnail_path = thumbnail_path
-        self._upload_to_shotgun = upload_to_shotgun
-        self._errors = []
-
-    def get_errors(self):
-        """
-        can be called after execution to retrieve a list of errors
-        """
-        return self._errors
-
-    def run(self):
-        """
-        Thread loop
-        """
-        upload_error = False
-
-        if self._upload_to_shotgun:
-            try:
-                self._app.tank.shotgun.upload("Version", self._version["id"], self._path_to_movie, "sg_uploaded_movie")
-            except Exception, e:
-                self._errors.append("Movie upload to Shotgun failed: %s" % e)
-                upload_error = True
-
-        if not self._upload_to_shotgun or upload_error:
-            try:
-                self._app.tank.shotgun.upload_thumbnail("Version", self._version["id"], self._thumbnail_path)
-            except Exception, e:
-                self._errors.append("Thumbnail upload to Shotgun failed: %s" % e)
\ No newline at end of file
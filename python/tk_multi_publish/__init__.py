@@ -8,4 +8,24 @@
 # agreement to the Shotgun Pipeline Toolkit Source Code License. All rights 
 # not expressly granted therein are reserved by Shotgun Software Inc.
 
-from .publish import PublishHandler
\ No newline at end of file
+from .publish import PublishHandler
+from .copy_engine import CopyEngine
+from .copy_strategies import CopyStrategyChain
+from .publish_manifest import PublishManifest, FrameHashes, plan_delta_publish
+from .directory_cache import DirectoryCache
+from .sequence_index import SequenceIndex, ImageSequence
+from .frame_set import FrameSet
+from .preview_stream import PreviewStream, PreviewError, h264_encode_args
+from .process_pool import ProcessPool, ProcessError
+from .preview_cache import PreviewCache
+from .color_engine import ColorEngine
+from .registration_queue import RegistrationQueue, supports_dry_run
+from .upload_queue import UploadQueue, UploadJob
+from .chunked_upload import ChunkedUploader, HttpPutTransport, ShotgunTransport
+from .ttl_cache import TtlCache
+from .thumbnail_share import ThumbnailSharer
+from .aepx import AepxDocument, AepxError
+from .version_index import VersionIndex, watch_depths
+from .template_cache import TemplateCache
+from .publish_name import PublishNameFormatter
+from .batch import BatchPublisher, parse_command_line, write_result
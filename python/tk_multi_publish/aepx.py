@@ -0,0 +1,141 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import os
+import xml.sax
+from xml.sax.saxutils import XMLGenerator
+
+try:
+    import xml.etree.cElementTree as ET
+except ImportError:
+    import xml.etree.ElementTree as ET
+
+AE_NAMESPACE = "http://www.adobe.com/products/aftereffects"
+
+class AepxError(Exception):
+    """
+    Raised when an After Effects XML project can't be read
+    """
+
+class AepxDocument(object):
+    """
+    Reads an After Effects XML project (.aepx) as a stream rather than
+    loading the whole document, so memory use doesn't grow with the size
+    of the project.  Elements are discarded as soon as they have been
+    parsed, only the chain of elements enclosing the current one is kept.
+    """
+
+    def __init__(self, path):
+        """
+        Construction
+
+        :param path:    The path of the .aepx file
+        """
+        self.path = path
+        self._root_tag = None
+
+    @property
+    def root_tag(self):
+        """
+        The tag of the root element, e.g. {namespace}AfterEffectsProject
+        """
+        if self._root_tag is None:
+            # only the first element needs to be parsed:
+            for _, element in self._iterparse(("start",)):
+                self._root_tag = element.tag
+                break
+        return self._root_tag
+
+    def is_aftereffects_project(self):
+        """
+        Return True if the root element is in the After Effects namespace
+        """
+        return self.root_tag is not None and self.root_tag.startswith("{%s}" % AE_NAMESPACE)
+
+    def file_references(self):
+        """
+        Iterate over the attributes of every fileReference element in the
+        project, in document order, as dictionaries
+        """
+        ancestors = []
+        for event, element in self._iterparse(("start", "end")):
+            if event == "start":
+                if not ancestors:
+                    self._root_tag = element.tag
+                ancestors.append(element)
+                continue
+
+            ancestors.pop()
+            if element.tag.endswith("fileReference"):
+                yield dict(element.attrib)
+            # the element is finished with so drop it from its parent, which
+            # keeps the partial tree down to the current chain of elements:
+            if ancestors:
+                ancestors[-1].remove(element)
+            element.clear()
+
+    def rewrite(self, target_path, references):
+        """
+        Write a copy of the project with the paths of its file references
+        replaced, in a single pass over the document.
+
+        :param target_path: The path to write the copy to
+        :param references:  Dictionary of old path -> new path for the
+                            references to replace
+        :returns:           The number of references that were replaced
+        """
+        temp_path = "%s.tmp" % target_path
+        try:
+            with open(temp_path, "wb") as f:
+                handler = _ReferenceRewriter(f, references)
+                parser = xml.sax.make_parser()
+                parser.setFeature(xml.sax.handler.feature_namespaces, False)
+                parser.setFeature(xml.sax.handler.feature_external_ges, False)
+                parser.setContentHandler(handler)
+                parser.parse(self.path)
+        except (xml.sax.SAXException, IOError, OSError) as e:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise AepxError("Failed to write After Effects project %s: %s" % (target_path, e))
+
+        if os.path.exists(target_path):
+            os.remove(target_path)
+        os.rename(temp_path, target_path)
+        return handler.replaced
+
+    def _iterparse(self, events):
+        try:
+            with open(self.path, "rb") as f:
+                for event, element in ET.iterparse(f, events):
+                    yield event, element
+        except (SyntaxError, IOError, OSError) as e:
+            # ParseError is a SyntaxError
+            raise AepxError("Failed to read After Effects project %s: %s" % (self.path, e))
+
+class _ReferenceRewriter(XMLGenerator):
+    """
+    Writes the document it is given back out, replacing the fullpath
+    attribute of fileReference elements on the way
+    """
+    def __init__(self, out, references):
+        try:
+            XMLGenerator.__init__(self, out, "utf-8", short_empty_elements=True)
+        except TypeError:
+            # python 2
+            XMLGenerator.__init__(self, out, "utf-8")
+        self._references = references
+        self.replaced = 0
+
+    def startElement(self, name, attrs):
+        if name.endswith("fileReference") and attrs.get("fullpath") in self._references:
+            attrs = dict(attrs.items())
+            attrs["fullpath"] = self._references[attrs["fullpath"]]
+            self.replaced += 1
+        XMLGenerator.startElement(self, name, attrs)
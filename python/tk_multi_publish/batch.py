@@ -0,0 +1,305 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import os
+import json
+import time
+import argparse
+
+from tank import TankError
+
+from .upload_queue import UploadJob
+
+# app attributes the dialog uses that a batch publish changes:
+_APP_STATE = ["agnostic_scene_contents", "initialized_from", "context_fields", "batch_fields"]
+_UNSET = object()
+
+class BatchPublisher(object):
+    """
+    Runs a publish without the dialog, e.g. from a script or on the farm.
+    The files are given the same way they would be dropped onto the
+    dialog, every task found for them is published and any value the
+    hooks would ask the user for comes from a dictionary of fields.
+    """
+
+    def __init__(self, app, handler):
+        """
+        Construction
+
+        :param app:     The app instance
+        :param handler: The PublishHandler to run the publish with
+        """
+        self._app = app
+        self._handler = handler
+
+    def publish(self, primary_path, secondary_paths=None, fields=None, comment="",
+                sg_task=None, thumbnail_path=None, ignore_pre_publish_errors=False,
+                wait_for_uploads=True, upload_timeout=3600):
+        """
+        Publish a primary file and its secondary files, running the
+        pre-publish, publish and post-publish hooks in turn.
+
+        :param primary_path:                The path of the primary file
+        :param secondary_paths:             List of paths of secondary files.  Image
+                                            sequences are found from any of their frames.
+        :param fields:                      Dictionary of values for the fields the
+                                            publish would ask the user for, e.g. name
+        :param comment:                     The comment for the publish
+        :param sg_task:                     The Shotgun task to link the publish to,
+                                            defaults to the task of the context
+        :param thumbnail_path:              The thumbnail for the publish, defaults to
+                                            the one from the thumbnail hook
+        :param ignore_pre_publish_errors:   Carry on with the publish if the pre-publish
+                                            checks return any messages
+        :param wait_for_uploads:            Wait for the background uploads to finish
+        :param upload_timeout:              The most seconds to wait for the uploads,
+                                            any still going after that are listed in
+                                            the result
+        :returns:                           Dictionary describing the result, ready to
+                                            be written as JSON
+        """
+        result = {"primary_path": primary_path,
+                  "secondary_paths": list(secondary_paths or []),
+                  "success": False,
+                  "publish_path": None,
+                  "tasks": [],
+                  "errors": [],
+                  "uploads": {},
+                  "unfinished_uploads": []}
+
+        # the dialog may be open with its own files loaded:
+        saved_state = self._save_state()
+
+        self._app.batch_fields = dict(fields or {})
+        try:
+            self._publish(result, primary_path, secondary_paths or [], comment, sg_task,
+                          thumbnail_path, ignore_pre_publish_errors)
+        except TankError as e:
+            result["errors"].append("%s" % e)
+        except Exception as e:
+            self._app.log_exception("Batch publish failed")
+            result["errors"].append("%s" % e)
+        finally:
+            self._restore_state(saved_state)
+
+        upload_queue = self._app.upload_queue
+        if wait_for_uploads:
+            give_up_at = time.time() + upload_timeout
+            while upload_queue.is_busy() and time.time() < give_up_at:
+                time.sleep(1.0)
+        result["uploads"] = upload_queue.summary()
+        result["unfinished_uploads"] = [{"label": job.label,
+                                         "path": job.path,
+                                         "entity_type": job.entity_type,
+                                         "entity_id": job.entity_id,
+                                         "state": job.state}
+                                        for job in upload_queue.jobs()
+                                        if job.state in (UploadJob.PENDING, UploadJob.UPLOADING)]
+        if wait_for_uploads and result["unfinished_uploads"]:
+            result["errors"].append("%d uploads didn't finish within %d seconds"
+                                    % (len(result["unfinished_uploads"]), upload_timeout))
+
+        result["success"] = not result["errors"]
+        return result
+
+    def _save_state(self):
+        """
+        Return the state of the handler and app that a batch publish
+        changes.  The app attributes are only set once the dialog or the
+        hooks have used them so may not exist yet.
+        """
+        app_state = dict((name, getattr(self._app, name, _UNSET)) for name in _APP_STATE)
+        return self._handler._primary_output, app_state
+
+    def _restore_state(self, state):
+        """
+        Put back state returned by _save_state
+        """
+        self._handler._primary_output, app_state = state
+        for name, value in app_state.items():
+            if value is not _UNSET:
+                setattr(self._app, name, value)
+            elif hasattr(self._app, name):
+                delattr(self._app, name)
+
+    def _publish(self, result, primary_path, secondary_paths, comment, sg_task,
+                 thumbnail_path, ignore_pre_publish_errors):
+        self._load(primary_path, secondary_paths)
+
+        # all the tasks found are published:
+        tasks = self._handler.get_publish_tasks()
+        primary_task = None
+        secondary_tasks = []
+        for task in tasks:
+            if task.output.is_primary:
+                primary_task = task
+            else:
+                secondary_tasks.append(task)
+        if not primary_task:
+            raise TankError("Couldn't find primary task to publish!")
+
+        if sg_task is None:
+            sg_task = self._app.context.task
+        if thumbnail_path is None:
+            thumbnail_path = self._app.execute_hook("hook_thumbnail") or ""
+
+        user_data = dict()
+        try:
+            self._handler._do_pre_publish(primary_task, secondary_tasks, self._report, user_data=user_data)
+
+            num_errors = sum(len(task.pre_publish_errors) for task in [primary_task] + secondary_tasks)
+            if num_errors and not ignore_pre_publish_errors:
+                result["errors"].append("Pre-publish checks returned %d messages" % num_errors)
+                return
+
+            try:
+                result["publish_path"] = self._handler._do_primary_publish(
+                    primary_task, sg_task, thumbnail_path, comment, self._report, user_data=user_data)
+                self._handler._do_secondary_publish(
+                    secondary_tasks, primary_task, result["publish_path"], sg_task, thumbnail_path,
+                    comment, self._report, user_data=user_data)
+            except Exception as e:
+                self._app.log_exception("Publish Failed")
+                result["errors"].append("%s" % e)
+                result["errors"].append("Post-publish was not run due to previous errors!")
+                return
+
+            for task in secondary_tasks:
+                for error in task.publish_errors:
+                    result["errors"].append("%s, %s: %s" % (task.output.display_name, task.item.name, error))
+
+            try:
+                self._handler._do_post_publish(primary_task, secondary_tasks, self._report, user_data=user_data)
+            except Exception as e:
+                self._app.log_exception("Post-publish Failed")
+                result["errors"].append("Post-publish: %s" % e)
+        finally:
+            result["tasks"] = [{"output": task.output.name,
+                                "item": task.item.name,
+                                "pre_publish_errors": list(task.pre_publish_errors),
+                                "publish_errors": list(task.publish_errors)}
+                               for task in [primary_task] + secondary_tasks]
+
+    def _load(self, primary_path, secondary_paths):
+        """
+        Set up the scene contents the way dropping the files onto
+        the dialog would
+        """
+        primary_path = os.path.abspath(primary_path)
+        extension = os.path.splitext(primary_path)[1][1:]
+        primary_output = None
+        for output in self._handler._primary_outputs:
+            if output.extension == extension:
+                primary_output = output
+        if not primary_output:
+            raise TankError("The file format (extension) of %s doesn't match any of the primary outputs"
+                            % primary_path)
+
+        secondary = []
+        def store_item(path, class_type):
+            item = {"type": "secondary", "path": path, "class": class_type}
+            if item not in secondary:
+                secondary.append(item)
+
+        paths = [os.path.abspath(path) for path in secondary_paths]
+        if len(paths) == 1:
+            # a single frame of a sequence publishes the whole sequence:
+            if self._app.detect_image_sequence(paths[0]):
+                store_item(self._app.detect_sequence(paths[0]).format_path(), "sequence")
+            else:
+                store_item(paths[0], "single")
+        elif paths:
+            sequences, singles = self._app.detect_sequences(paths)
+            for seq in sequences:
+                store_item(seq.format_path(), "sequence")
+            for path in singles:
+                store_item(path, "single")
+
+        self._handler._primary_output = primary_output
+        self._app.agnostic_scene_contents = {"primary": {"type": "primary", "path": primary_path, "output": primary_output},
+                                             "secondary": secondary}
+        self._app.initialized_from = "primary"
+
+    def _report(self, percent, msg=None, stage=None):
+        if msg:
+            self._app.log_debug("%3d%% %s" % (percent, msg))
+
+class _ArgumentParser(argparse.ArgumentParser):
+    """
+    Raises a TankError rather than exiting, as the command runs
+    inside the engine
+    """
+    def error(self, message):
+        raise TankError("%s\n%s" % (self.format_usage().strip(), message))
+
+    def print_help(self, file=None):
+        # -h prints the help then exits:
+        raise TankError(self.format_help())
+
+    def exit(self, status=0, message=None):
+        raise TankError(message or "%s exited" % self.prog)
+
+def parse_command_line(args):
+    """
+    Parse the arguments of the batch publish command into a dictionary
+    of keyword arguments for BatchPublisher.publish, plus the path to
+    write the result to under 'output'
+    """
+    parser = _ArgumentParser(prog="publish_batch",
+                             description="Publish files without the publish dialog")
+    parser.add_argument("primary_path", help="The primary file to publish")
+    parser.add_argument("secondary_paths", nargs="*", help="Secondary files or image sequence frames")
+    parser.add_argument("-f", "--field", action="append", default=[], metavar="KEY=VALUE",
+                        help="Value for a field the publish would ask for, e.g. name=master")
+    parser.add_argument("-c", "--comment", default="", help="The comment for the publish")
+    parser.add_argument("-t", "--task-id", type=int, help="Id of the Shotgun task to link the publish to")
+    parser.add_argument("--thumbnail", help="The thumbnail for the publish")
+    parser.add_argument("--ignore-pre-publish-errors", action="store_true",
+                        help="Publish even if the pre-publish checks return messages")
+    parser.add_argument("--no-wait", action="store_true",
+                        help="Don't wait for the background uploads to finish")
+    parser.add_argument("--upload-timeout", type=int, default=3600,
+                        help="The most seconds to wait for the background uploads")
+    parser.add_argument("-o", "--output", help="File to write the result to as JSON, defaults to stdout")
+    options = parser.parse_args(args)
+
+    fields = {}
+    for field in options.field:
+        key, sep, value = field.partition("=")
+        if not sep:
+            parser.error("Fields should be given as KEY=VALUE: %s" % field)
+        fields[key] = value
+
+    return {"primary_path": options.primary_path,
+            "secondary_paths": options.secondary_paths,
+            "fields": fields,
+            "comment": options.comment,
+            "sg_task": {"type": "Task", "id": options.task_id} if options.task_id else None,
+            "thumbnail_path": options.thumbnail,
+            "ignore_pre_publish_errors": options.ignore_pre_publish_errors,
+            "wait_for_uploads": not options.no_wait,
+            "upload_timeout": options.upload_timeout,
+            "output": options.output}
+
+def write_result(result, path=None):
+    """
+    Write the result of a batch publish as JSON to a file, or to
+    stdout if no path is given
+    """
+    data = json.dumps(result, indent=4, sort_keys=True, default=str)
+    if not path:
+        print(data)
+        return
+    temp_path = "%s.%s.tmp" % (path, os.getpid())
+    with open(temp_path, "w") as f:
+        f.write(data)
+    if os.path.exists(path):
+        os.remove(path)
+    os.rename(temp_path, path)
@@ -0,0 +1,227 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import os
+import json
+import uuid
+import hashlib
+
+try:
+    import urllib2 as urllib_request
+    from urlparse import urlunparse
+except ImportError:
+    # python 3
+    import urllib.request as urllib_request
+    from urllib.parse import urlunparse
+
+class TransportNotSupported(Exception):
+    """
+    Raised when a transport can't do chunked uploads
+    """
+
+class HttpPutTransport(object):
+    """
+    Uploads each chunk of a file with an HTTP PUT request carrying a
+    Content-Range header, e.g. to a local stand-in server for testing.
+    """
+    def __init__(self, base_url, timeout=60):
+        """
+        Construction
+
+        :param base_url:    The url files are uploaded under
+        :param timeout:     Seconds to wait for each request
+        """
+        self._base_url = base_url.rstrip("/")
+        self._timeout = timeout
+
+    def begin(self, path, size):
+        return {"url": "%s/%s/%s" % (self._base_url, uuid.uuid4().hex, os.path.basename(path))}
+
+    def send(self, session, data, offset, size, part_number):
+        request = urllib_request.Request(session["url"], data=data)
+        request.get_method = lambda: "PUT"
+        request.add_header("Content-Type", "application/octet-stream")
+        request.add_header("Content-Range", "bytes %d-%d/%d" % (offset, offset + len(data) - 1, size))
+        response = urllib_request.urlopen(request, timeout=self._timeout)
+        try:
+            return response.info().get("ETag") or str(part_number)
+        finally:
+            response.close()
+
+    def finish(self, session, parts):
+        request = urllib_request.Request(session["url"] + "?complete=1",
+                                         data=json.dumps(parts).encode("utf-8"))
+        request.add_header("Content-Type", "application/json")
+        urllib_request.urlopen(request, timeout=self._timeout).close()
+
+class ShotgunTransport(object):
+    """
+    Uploads a file to a field of a Shotgun entity as a multi-part upload
+    to Shotgun's storage, then links it to the entity.  This uses the
+    same requests as Shotgun.upload but exposes each part so an upload
+    can be resumed.
+    """
+
+    # methods of the shotgun connection the multi-part upload needs
+    REQUIRED_METHODS = ["_get_attachment_upload_info", "_get_upload_part_link",
+                        "_upload_data_to_storage", "_complete_multipart_upload",
+                        "_send_form", "_auth_params"]
+
+    def __init__(self, connection, entity_type, entity_id, field):
+        """
+        Construction
+
+        :param connection:  The Shotgun connection to upload with
+        :param entity_type: The type of the entity to upload to
+        :param entity_id:   The id of the entity to upload to
+        :param field:       The field to upload the file to
+        """
+        if not all(hasattr(connection, name) for name in ShotgunTransport.REQUIRED_METHODS):
+            raise TransportNotSupported("This version of the Shotgun API can't resume uploads")
+        server_info = getattr(connection, "server_info", None) or {}
+        if not server_info.get("s3_direct_uploads_enabled"):
+            # the parts can only be sent straight to storage
+            raise TransportNotSupported("This Shotgun site doesn't upload directly to storage")
+        self._connection = connection
+        self._entity_type = entity_type
+        self._entity_id = entity_id
+        self._field = field
+
+    def begin(self, path, size):
+        upload_info = self._connection._get_attachment_upload_info(False, os.path.basename(path), True)
+        return {"upload_info": upload_info, "filename": os.path.basename(path)}
+
+    def send(self, session, data, offset, size, part_number):
+        part_url = self._connection._get_upload_part_link(session["upload_info"], session["filename"], part_number)
+        return self._connection._upload_data_to_storage(data, "application/octet-stream", len(data), part_url)
+
+    def finish(self, session, parts):
+        self._connection._complete_multipart_upload(session["upload_info"], session["filename"], parts)
+
+        # link the uploaded file to the entity:
+        config = self._connection.config
+        url = urlunparse((config.scheme, config.server, "/upload/api_link_file", None, None, None))
+        params = {"entity_type": self._entity_type,
+                  "entity_id": self._entity_id,
+                  "upload_link_info": session["upload_info"]["upload_info"],
+                  "field_name": self._field,
+                  "display_name": session["filename"]}
+        params.update(self._connection._auth_params())
+        result = self._connection._send_form(url, params)
+        if not str(result).startswith("1"):
+            raise IOError("Could not link the uploaded file to %s %s: %s"
+                          % (self._entity_type, self._entity_id, result))
+
+class ChunkedUploader(object):
+    """
+    Uploads a file in fixed size chunks through a transport, recording the
+    offset that has been reached in a state file after every chunk.  If an
+    upload fails, uploading the same file again carries on from the last
+    chunk that was sent rather than starting over.  If carrying on fails
+    straight away, or the upload can't be finished, the state is dropped
+    so the next attempt starts a new upload.
+    """
+
+    # the smallest part size allowed by S3 multi-part uploads
+    CHUNK_SIZE = 5 * 1024 * 1024
+
+    def __init__(self, transport, state_dir, chunk_size=None):
+        """
+        Construction
+
+        :param transport:   The transport to send the chunks with.  This needs
+                            begin(path, size), send(session, data, offset, size, part_number)
+                            and finish(session, parts) methods.
+        :param state_dir:   Folder the state files of unfinished uploads are kept in
+        :param chunk_size:  The size of each chunk in bytes
+        """
+        self._transport = transport
+        self._state_dir = state_dir
+        self._chunk_size = chunk_size or ChunkedUploader.CHUNK_SIZE
+
+    def upload(self, path, key, progress_cb=None):
+        """
+        Upload a file, resuming an earlier upload with the same key if
+        the file hasn't changed since.
+
+        :param path:        The path of the file to upload
+        :param key:         String identifying the upload, e.g. the entity and field
+                            the file is uploaded to
+        :param progress_cb: Optional function called as progress_cb(bytes_sent, total)
+                            after each chunk
+        """
+        stat = os.stat(path)
+        state_path = self._state_path(key)
+        state = self._load_state(state_path)
+        resumed = bool(state)
+        if (not state or state["path"] != path
+            or state["size"] != stat.st_size or state["mtime"] != stat.st_mtime):
+            state = {"path": path,
+                     "size": stat.st_size,
+                     "mtime": stat.st_mtime,
+                     "session": self._transport.begin(path, stat.st_size),
+                     "offset": 0,
+                     "parts": []}
+            resumed = False
+            self._save_state(state_path, state)
+
+        if progress_cb:
+            progress_cb(state["offset"], state["size"])
+
+        with open(path, "rb") as f:
+            f.seek(state["offset"])
+            while state["offset"] < state["size"]:
+                data = f.read(self._chunk_size)
+                if not data:
+                    self._remove_state(state_path)
+                    raise IOError("%s was truncated while uploading" % path)
+                try:
+                    part = self._transport.send(state["session"], data, state["offset"],
+                                                state["size"], len(state["parts"]) + 1)
+                except Exception:
+                    if resumed:
+                        # the earlier session has most likely expired
+                        self._remove_state(state_path)
+                    raise
+                resumed = False
+                state["parts"].append(part)
+                state["offset"] += len(data)
+                self._save_state(state_path, state)
+                if progress_cb:
+                    progress_cb(state["offset"], state["size"])
+
+        try:
+            self._transport.finish(state["session"], state["parts"])
+        finally:
+            self._remove_state(state_path)
+
+    def _state_path(self, key):
+        return os.path.join(self._state_dir, "%s.json" % hashlib.sha1(key.encode("utf-8")).hexdigest())
+
+    def _remove_state(self, state_path):
+        if os.path.exists(state_path):
+            os.remove(state_path)
+
+    def _load_state(self, state_path):
+        try:
+            with open(state_path, "r") as f:
+                return json.load(f)
+        except (IOError, OSError, ValueError):
+            return None
+
+    def _save_state(self, state_path, state):
+        if not os.path.isdir(self._state_dir):
+            os.makedirs(self._state_dir)
+        temp_path = "%s.tmp" % state_path
+        with open(temp_path, "w") as f:
+            json.dump(state, f)
+        if os.path.exists(state_path):
+            os.remove(state_path)
+        os.rename(temp_path, state_path)
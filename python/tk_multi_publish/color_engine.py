@@ -0,0 +1,150 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+def srgb_transfer(linear):
+    """
+    Apply the sRGB transfer function to an array of linear values in
+    the 0-1 range, returning a new array
+    """
+    return numpy.where(linear <= 0.0031308,
+                       linear * 12.92,
+                       1.055 * numpy.power(linear, 1.0 / 2.4) - 0.055)
+
+class ColorEngine(object):
+    """
+    Converts linear float pixels, as read from EXR files, to packed 8 bit
+    sRGB.  Channels are converted in place in buffers that are allocated
+    once per resolution and reused for every frame, so memory use stays
+    flat however many frames are converted.
+
+    With the LUT fast path half float channels are converted with a single
+    lookup of their 16 bit pattern, and full float channels are quantized
+    to a fine LUT index rather than having the transfer function applied
+    exactly.
+    """
+
+    # entries in the LUT used for full float channels
+    FLOAT_LUT_SIZE = 16384
+
+    def __init__(self, use_lut=True):
+        """
+        Construction
+
+        :param use_lut: Use lookup tables rather than evaluating the
+                        transfer function for every pixel
+        """
+        self._use_lut = use_lut
+        self._half_lut = None
+        self._float_lut = None
+        self._buffers = None
+
+    @staticmethod
+    def available():
+        return numpy is not None
+
+    def convert(self, channels, width, height, half=False):
+        """
+        Convert the red, green and blue channels of an image to 8 bit sRGB.
+
+        :param channels:    List of the three channels as strings of native
+                            endian half or float pixel data
+        :param width:       Width of the image
+        :param height:      Height of the image
+        :param half:        True if the channels contain half floats
+        :returns:           A flat uint8 array of interleaved rgb pixels.  The array
+                            is reused by the next call so must be consumed first.
+        """
+        buffers = self._get_buffers(width, height)
+        rgb = buffers["rgb"]
+        for index, data in enumerate(channels):
+            if half:
+                self._convert_half(data, rgb[:, :, index], buffers)
+            else:
+                self._convert_float(data, rgb[:, :, index], buffers)
+        return buffers["flat"]
+
+    def _get_buffers(self, width, height):
+        """
+        Return the working buffers for a resolution, allocating them
+        if the resolution has changed
+        """
+        if self._buffers is None or self._buffers["size"] != (width, height):
+            rgb = numpy.empty((height, width, 3), dtype=numpy.uint8)
+            self._buffers = {"size": (width, height),
+                             "rgb": rgb,
+                             "flat": rgb.reshape(-1),
+                             "float": numpy.empty((height, width), dtype=numpy.float32),
+                             "work": numpy.empty((height, width), dtype=numpy.float32),
+                             "mask": numpy.empty((height, width), dtype=bool),
+                             "index": numpy.empty((height, width), dtype=numpy.intp)}
+        return self._buffers
+
+    def _convert_half(self, data, out, buffers):
+        if not self._use_lut:
+            values = numpy.frombuffer(data, dtype=numpy.float16).reshape(out.shape)
+            buffers["float"][...] = values
+            self._transfer(out, buffers)
+            return
+
+        if self._half_lut is None:
+            # the 8 bit value of every possible half:
+            values = numpy.arange(65536, dtype=numpy.uint32).astype(numpy.uint16).view(numpy.float16)
+            linear = numpy.clip(numpy.nan_to_num(values.astype(numpy.float32)), 0.0, 1.0)
+            self._half_lut = (srgb_transfer(linear) * 255.0 + 0.5).astype(numpy.uint8)
+
+        bits = numpy.frombuffer(data, dtype=numpy.uint16).reshape(out.shape)
+        numpy.take(self._half_lut, bits, out=out, mode="clip")
+
+    def _convert_float(self, data, out, buffers):
+        pixels = buffers["float"]
+        pixels[...] = numpy.frombuffer(data, dtype=numpy.float32).reshape(out.shape)
+
+        if not self._use_lut:
+            self._transfer(out, buffers)
+            return
+
+        if self._float_lut is None:
+            linear = numpy.linspace(0.0, 1.0, ColorEngine.FLOAT_LUT_SIZE)
+            self._float_lut = (srgb_transfer(linear) * 255.0 + 0.5).astype(numpy.uint8)
+
+        # fmax replaces nans as well as clamping negative values:
+        numpy.fmax(pixels, 0.0, out=pixels)
+        numpy.minimum(pixels, 1.0, out=pixels)
+        numpy.multiply(pixels, ColorEngine.FLOAT_LUT_SIZE - 1, out=pixels)
+        numpy.add(pixels, 0.5, out=pixels)
+        index = buffers["index"]
+        index[...] = pixels
+        numpy.take(self._float_lut, index, out=out, mode="clip")
+
+    def _transfer(self, out, buffers):
+        """
+        Apply the exact transfer function to the float buffer
+        and quantize the result into out
+        """
+        pixels = buffers["float"]
+        work = buffers["work"]
+        mask = buffers["mask"]
+
+        numpy.fmax(pixels, 0.0, out=pixels)
+        numpy.minimum(pixels, 1.0, out=pixels)
+        numpy.power(pixels, 1.0 / 2.4, out=work)
+        numpy.multiply(work, 1.055, out=work)
+        numpy.subtract(work, 0.055, out=work)
+        numpy.less_equal(pixels, 0.0031308, out=mask)
+        numpy.multiply(pixels, 12.92, out=pixels)
+        numpy.copyto(work, pixels, where=mask)
+        numpy.multiply(work, 255.0, out=work)
+        numpy.add(work, 0.5, out=work)
+        out[...] = work
@@ -0,0 +1,152 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import threading
+
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+class CopyEngine(object):
+    """
+    Copies a list of (source, target) pairs concurrently using a
+    pool of worker threads.  Copies are fed to the workers through
+    a bounded queue so that very long sequences don't build up a
+    backlog of pending jobs in memory.
+    """
+
+    # how long the feeding thread blocks before checking for
+    # finished copies so that progress keeps being reported
+    POLL_INTERVAL = 0.05
+
+    def __init__(self, copy_fn, workers=1, max_pending=None):
+        """
+        Construction
+
+        :param copy_fn:     Function called as copy_fn(source_path, target_path)
+                            to copy a single file.  This is called from the
+                            worker threads so must be thread safe.
+        :param workers:     The number of worker threads to copy with
+        :param max_pending: The maximum number of copies waiting in the queue.
+                            Defaults to a few per worker.
+        """
+        self._copy_fn = copy_fn
+        self._workers = max(1, int(workers or 1))
+        self._max_pending = max(1, int(max_pending or self._workers * 4))
+
+    @property
+    def workers(self):
+        return self._workers
+
+    def run(self, pairs, progress_cb=None):
+        """
+        Copy all the pairs, returning once every copy has finished.
+
+        :param pairs:       List of (source_path, target_path) tuples
+        :param progress_cb: Optional function called as progress_cb(completed, total)
+                            each time a copy finishes.  This is always called
+                            from the thread that called run().
+        :returns:           A list of (source_path, target_path, error) tuples for
+                            all copies that failed, in the same order as pairs
+        """
+        pairs = list(pairs)
+        total = len(pairs)
+        if not total:
+            return []
+
+        if self._workers == 1 or total == 1:
+            # no point spinning up threads:
+            return self._run_serial(pairs, progress_cb)
+
+        jobs = queue.Queue(self._max_pending)
+        results = queue.Queue()
+        status = {"completed": 0, "errors": []}
+
+        threads = []
+        for _ in range(min(self._workers, total)):
+            thread = threading.Thread(target=self._worker, args=(jobs, results))
+            thread.daemon = True
+            thread.start()
+            threads.append(thread)
+
+        try:
+            for job in enumerate(pairs):
+                self._put(jobs, job, results, status, total, progress_cb)
+        finally:
+            # always stop the workers:
+            for _ in threads:
+                self._put(jobs, None, results, status, total, progress_cb)
+            for thread in threads:
+                thread.join()
+
+        # collect anything that finished whilst the workers were stopping:
+        self._drain(results, status, total, progress_cb)
+
+        return [error[1:] for error in sorted(status["errors"])]
+
+    def _run_serial(self, pairs, progress_cb):
+        """
+        Copy all pairs from the current thread
+        """
+        errors = []
+        for completed, (source_path, target_path) in enumerate(pairs):
+            try:
+                self._copy_fn(source_path, target_path)
+            except Exception as e:
+                errors.append((source_path, target_path, "%s" % e))
+            if progress_cb:
+                progress_cb(completed + 1, len(pairs))
+        return errors
+
+    def _put(self, jobs, job, results, status, total, progress_cb):
+        """
+        Add a job to the bounded queue, reporting on any finished
+        copies whilst waiting for space
+        """
+        while True:
+            try:
+                jobs.put(job, timeout=CopyEngine.POLL_INTERVAL)
+                break
+            except queue.Full:
+                pass
+            finally:
+                self._drain(results, status, total, progress_cb)
+
+    def _drain(self, results, status, total, progress_cb):
+        """
+        Process all finished copies
+        """
+        while True:
+            try:
+                index, source_path, target_path, error = results.get_nowait()
+            except queue.Empty:
+                break
+            status["completed"] += 1
+            if error is not None:
+                status["errors"].append((index, source_path, target_path, error))
+            if progress_cb:
+                progress_cb(status["completed"], total)
+
+    def _worker(self, jobs, results):
+        """
+        Worker thread loop - copies files until a None job is received
+        """
+        while True:
+            job = jobs.get()
+            if job is None:
+                break
+            index, (source_path, target_path) = job
+            error = None
+            try:
+                self._copy_fn(source_path, target_path)
+            except Exception as e:
+                error = "%s" % e
+            results.put((index, source_path, target_path, error))
@@ -0,0 +1,179 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import os
+import sys
+import errno
+import shutil
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    # not available on Windows
+    fcntl = None
+
+# ioctl request to clone a file on Linux (btrfs, xfs, ...)
+FICLONE = 0x40049409
+
+# errors that mean a strategy can't be used between two mounts
+# rather than that the copy itself failed
+UNSUPPORTED_ERRNOS = set(
+    getattr(errno, name) for name in
+    ["EXDEV", "EPERM", "EOPNOTSUPP", "ENOTSUP", "ENOSYS", "EINVAL", "ENOTTY", "EMLINK", "EBADF"]
+    if hasattr(errno, name)
+)
+
+class StrategyNotSupported(Exception):
+    """
+    Raised when a copy strategy can't be used for a pair of files
+    """
+
+class CopyStrategyChain(object):
+    """
+    Copies files using the first strategy from a configurable chain
+    that works between the source and target mounts.  The strategy
+    that works for each pair of mounts is remembered so that later
+    copies go straight to it.
+
+    Available strategies, from fastest to slowest:
+
+        hardlink:           Link the target to the source file.  The published file
+                            shares its data with the source so this is only used when
+                            asked for, when work files are never modified in place.
+        reflink:            Clone the file with the FICLONE ioctl.  The data is shared
+                            copy-on-write so later changes to either file are safe.
+        copy_file_range:    Copy inside the kernel with os.copy_file_range or os.sendfile
+        buffered:           Copy through userspace, the same as shutil.copy
+    """
+
+    STRATEGIES = ["hardlink", "reflink", "copy_file_range", "buffered"]
+
+    # the strategies used when none are given - hardlink is left out as
+    # re-rendering a work file in place would change the published file
+    DEFAULT_STRATEGIES = ["reflink", "copy_file_range", "buffered"]
+
+    BUFFER_SIZE = 1024 * 1024
+
+    def __init__(self, strategies=None):
+        """
+        Construction
+
+        :param strategies:  List of strategy names to try in order.  The buffered
+                            strategy is always tried last.
+        """
+        strategies = list(strategies or CopyStrategyChain.DEFAULT_STRATEGIES)
+        for name in strategies:
+            if name not in CopyStrategyChain.STRATEGIES:
+                raise ValueError("Unknown copy strategy '%s' - expected one of %s"
+                                 % (name, ", ".join(CopyStrategyChain.STRATEGIES)))
+        if "buffered" not in strategies:
+            strategies.append("buffered")
+        self._strategies = strategies
+
+        # (source device, target device) -> index of the first strategy
+        # that is known to work between them
+        self._mount_strategies = {}
+        self._lock = threading.Lock()
+
+    @property
+    def strategies(self):
+        return list(self._strategies)
+
+    def get_mount_strategy(self, source_path, target_path):
+        """
+        Return the name of the strategy that has been found to work
+        between the mounts of the two paths, or None if no file has
+        been copied between them yet.
+        """
+        index = self._mount_strategies.get(self._mount_key(source_path, target_path))
+        return None if index is None else self._strategies[index]
+
+    def copy(self, source_path, target_path):
+        """
+        Copy source_path to target_path.  The target folder must already exist.
+
+        :returns:   The name of the strategy that was used
+        """
+        if os.path.lexists(target_path):
+            # the target may be a link to another file, e.g. an earlier
+            # published version, that writing into it would change:
+            os.remove(target_path)
+
+        mount_key = self._mount_key(source_path, target_path)
+        with self._lock:
+            start = self._mount_strategies.get(mount_key, 0)
+
+        for index in range(start, len(self._strategies)):
+            name = self._strategies[index]
+            try:
+                getattr(self, "_copy_%s" % name)(source_path, target_path, mount_key)
+            except StrategyNotSupported:
+                continue
+            except (OSError, IOError) as e:
+                if name == "buffered" or e.errno not in UNSUPPORTED_ERRNOS:
+                    raise
+                continue
+
+            with self._lock:
+                self._mount_strategies[mount_key] = index
+            return name
+
+    def _mount_key(self, source_path, target_path):
+        """
+        Key identifying the mounts the source and target live on
+        """
+        return (os.stat(source_path).st_dev,
+                os.stat(os.path.dirname(target_path) or ".").st_dev)
+
+    def _copy_hardlink(self, source_path, target_path, mount_key):
+        if not hasattr(os, "link") or mount_key[0] != mount_key[1]:
+            raise StrategyNotSupported()
+        if os.path.lexists(target_path):
+            # left by a strategy tried before this one
+            os.remove(target_path)
+        os.link(source_path, target_path)
+
+    def _copy_reflink(self, source_path, target_path, mount_key):
+        if fcntl is None or mount_key[0] != mount_key[1]:
+            raise StrategyNotSupported()
+        with open(source_path, "rb") as source_file:
+            with open(target_path, "wb") as target_file:
+                fcntl.ioctl(target_file.fileno(), FICLONE, source_file.fileno())
+        shutil.copymode(source_path, target_path)
+
+    def _copy_copy_file_range(self, source_path, target_path, mount_key):
+        copy_range = getattr(os, "copy_file_range", None)
+        if copy_range is None:
+            send_file = getattr(os, "sendfile", None)
+            if send_file is None or not sys.platform.startswith("linux"):
+                # only Linux can send from a file to a file, at the
+                # current offset when it isn't given
+                raise StrategyNotSupported()
+            copy_range = lambda source_fd, target_fd, count: send_file(target_fd, source_fd, None, count)
+
+        with open(source_path, "rb") as source_file:
+            with open(target_path, "wb") as target_file:
+                remaining = os.fstat(source_file.fileno()).st_size
+                while remaining > 0:
+                    copied = copy_range(source_file.fileno(), target_file.fileno(),
+                                        min(remaining, 1024 * CopyStrategyChain.BUFFER_SIZE))
+                    if copied == 0:
+                        # the kernel won't copy any more of the file so
+                        # fall back to copying it through userspace
+                        raise StrategyNotSupported()
+                    remaining -= copied
+        shutil.copymode(source_path, target_path)
+
+    def _copy_buffered(self, source_path, target_path, mount_key):
+        with open(source_path, "rb") as source_file:
+            with open(target_path, "wb") as target_file:
+                shutil.copyfileobj(source_file, target_file, CopyStrategyChain.BUFFER_SIZE)
+        shutil.copymode(source_path, target_path)
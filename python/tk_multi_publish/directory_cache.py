@@ -0,0 +1,133 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import os
+import time
+import threading
+
+from .sequence_index import SequenceIndex
+
+try:
+    from os import scandir
+except ImportError:
+    try:
+        # backport for python 2
+        from scandir import scandir
+    except ImportError:
+        scandir = None
+
+class DirectorySnapshot(object):
+    """
+    The contents of a directory at the time it was listed
+    """
+    def __init__(self, path, mtime, names, file_names=None):
+        self.path = path
+        self.mtime = mtime
+        self.names = names
+        self.listed_at = time.time()
+        self._file_names = file_names
+        self._sequence_index = None
+
+    @property
+    def file_names(self):
+        if self._file_names is None:
+            # scandir isn't available so have to stat each entry:
+            self._file_names = tuple(name for name in self.names
+                                     if os.path.isfile(os.path.join(self.path, name)))
+        return self._file_names
+
+    @property
+    def sequence_index(self):
+        if self._sequence_index is None:
+            self._sequence_index = SequenceIndex.from_folder(self.path, self.file_names)
+        return self._sequence_index
+
+class DirectoryCache(object):
+    """
+    Cache of directory listings that is shared by everything that
+    runs during a publish.  A listing is reused for as long as the
+    modification time of the directory doesn't change.
+    """
+
+    # listings taken within this many seconds of the directory being
+    # modified aren't trusted as file systems with a coarse mtime
+    # resolution may be modified again without the mtime changing
+    MTIME_RESOLUTION = 2.0
+
+    def __init__(self):
+        """
+        Construction
+        """
+        self._snapshots = {}
+        self._lock = threading.Lock()
+
+    def clear(self):
+        """
+        Forget all cached listings
+        """
+        with self._lock:
+            self._snapshots = {}
+
+    def listdir(self, path):
+        """
+        Equivalent of os.listdir(path) that reuses the previous
+        listing if the directory hasn't changed.
+
+        :returns:   List of the names of all entries in the directory
+        """
+        return list(self.snapshot(path).names)
+
+    def listfiles(self, path):
+        """
+        Return the names of all files in the directory, skipping
+        any sub-directories
+        """
+        return list(self.snapshot(path).file_names)
+
+    def sequence_index(self, path):
+        """
+        Return a SequenceIndex of the files in a directory.  The index is
+        built once per listing of the directory.
+        """
+        return self.snapshot(path).sequence_index
+
+    def snapshot(self, path):
+        """
+        Return the DirectorySnapshot for a directory, listing it
+        again if it has changed since the last time.
+        """
+        path = os.path.normpath(path)
+        mtime = os.stat(path).st_mtime
+
+        with self._lock:
+            snapshot = self._snapshots.get(path)
+        if (snapshot and snapshot.mtime == mtime
+            and snapshot.listed_at - mtime > DirectoryCache.MTIME_RESOLUTION):
+            return snapshot
+
+        snapshot = self._list(path, mtime)
+        with self._lock:
+            self._snapshots[path] = snapshot
+        return snapshot
+
+    def _list(self, path, mtime):
+        """
+        List a directory in a single pass
+        """
+        if not scandir:
+            return DirectorySnapshot(path, mtime, tuple(os.listdir(path)))
+
+        names = []
+        file_names = []
+        for entry in scandir(path):
+            names.append(entry.name)
+            if entry.is_file():
+                file_names.append(entry.name)
+        return DirectorySnapshot(path, mtime, tuple(names), tuple(file_names))
@@ -0,0 +1,105 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import bisect
+from array import array
+
+try:
+    xrange
+except NameError:
+    # python 3
+    xrange = range
+
+class FrameSet(object):
+    """
+    Set of frame numbers stored as sorted runs of consecutive frames,
+    e.g. 1-100,105-200.  A complete sequence of any length takes the
+    same memory as a single frame.
+    """
+    def __init__(self, frames=None):
+        """
+        Construction
+
+        :param frames:  Optional iterable of frame numbers in any order
+        """
+        # inclusive start and end frame of each run
+        self._starts = array("l")
+        self._ends = array("l")
+        self._length = 0
+
+        for frame in sorted(set(frames or [])):
+            if self._ends and frame == self._ends[-1] + 1:
+                self._ends[-1] = frame
+            else:
+                self._starts.append(frame)
+                self._ends.append(frame)
+            self._length += 1
+
+    @classmethod
+    def from_ranges(cls, ranges):
+        """
+        Create a FrameSet from a sorted list of non-overlapping
+        (start, end) tuples where end is inclusive
+        """
+        frame_set = cls()
+        for start, end in ranges:
+            if frame_set._ends and start <= frame_set._ends[-1] + 1:
+                raise ValueError("Frame ranges must be sorted and must not overlap")
+            frame_set._starts.append(start)
+            frame_set._ends.append(end)
+            frame_set._length += end - start + 1
+        return frame_set
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        for start, end in zip(self._starts, self._ends):
+            for frame in xrange(start, end + 1):
+                yield frame
+
+    def __contains__(self, frame):
+        index = bisect.bisect_right(self._starts, frame) - 1
+        return index >= 0 and frame <= self._ends[index]
+
+    def __eq__(self, other):
+        return (isinstance(other, FrameSet)
+                and self._starts == other._starts and self._ends == other._ends)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __str__(self):
+        return ",".join(str(start) if start == end else "%d-%d" % (start, end)
+                        for start, end in self.ranges())
+
+    def __repr__(self):
+        return "FrameSet(%s)" % self
+
+    def start(self):
+        return self._starts[0]
+
+    def end(self):
+        return self._ends[-1]
+
+    def ranges(self):
+        """
+        Return the runs of consecutive frames as a list of
+        (start, end) tuples where end is inclusive
+        """
+        return list(zip(self._starts, self._ends))
+
+    def missing(self):
+        """
+        Return a FrameSet of the frames missing between the start
+        and end of the set
+        """
+        return FrameSet.from_ranges((self._ends[i] + 1, self._starts[i + 1] - 1)
+                                    for i in xrange(len(self._starts) - 1))
@@ -34,6 +34,9 @@ class PublishOutput(object):
 
         #especial case for primary outputs
         self.extension = fields.get("extension", None)
+
+        # resolved the first time it's needed:
+        self._publish_template = None
         
     @property
     def name(self):
@@ -65,8 +68,26 @@ class PublishOutput(object):
     
     @property
     def publish_template(self):
-        return self._app.get_template_by_name(self._raw_fields["publish_template"])
+        if self._publish_template is None:
+            self._publish_template = self._app.get_template_by_name(self._raw_fields["publish_template"])
+        return self._publish_template
         
+    @property
+    def copy_threads(self):
+        return self._raw_fields.get("copy_threads", 4)
+
+    @property
+    def preview_mode(self):
+        return self._raw_fields.get("preview_mode", "streaming")
+
+    @property
+    def preview_chunk_size(self):
+        return self._raw_fields.get("preview_chunk_size", 0)
+
+    @property
+    def preview_preset(self):
+        return self._raw_fields.get("preview_preset", "slow")
+
     @property
     def selected(self):
         return self._selected
@@ -95,6 +116,10 @@ class PublishOutput(object):
         dictionary["icon_path"] =  self.icon_path
         dictionary["tank_type"] =  self.tank_type
         dictionary["publish_template"] =  self.publish_template
+        dictionary["copy_threads"] =  self.copy_threads
+        dictionary["preview_mode"] =  self.preview_mode
+        dictionary["preview_chunk_size"] =  self.preview_chunk_size
+        dictionary["preview_preset"] =  self.preview_preset
         dictionary["name"] =  self.name
         dictionary["selected"] =  self.selected
         dictionary["required"] =  self.required
@@ -0,0 +1,122 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+
+class PreviewCache(object):
+    """
+    Local cache of preview movies keyed on the content of the frames they
+    were made from and the settings they were encoded with, so a sequence
+    that is published again unchanged reuses the movie rather than being
+    encoded again.
+
+    The cache is bounded in size and the least recently used movies are
+    removed first.
+    """
+
+    def __init__(self, root=None, max_size_mb=10240):
+        """
+        Construction
+
+        :param root:        The folder to keep the cache in, defaults to a
+                            folder in the temp directory
+        :param max_size_mb: The maximum total size of the cached movies in MB
+        """
+        self._root = root or os.path.join(tempfile.gettempdir(), "tk_preview_cache")
+        self._max_size = max_size_mb * 1024 * 1024
+
+    @property
+    def root(self):
+        return self._root
+
+    def key(self, frame_hashes, settings):
+        """
+        Return the cache key for a list of frames encoded with a set of settings.
+
+        :param frame_hashes:    List of the content hashes of the frames in order
+        :param settings:        Dictionary of the settings the movie is encoded with
+        """
+        digest = hashlib.sha1()
+        digest.update(json.dumps(settings, sort_keys=True).encode("utf-8"))
+        for index, frame_hash in enumerate(frame_hashes):
+            digest.update(("%d:%s\n" % (index, frame_hash)).encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, key):
+        """
+        Return the path of the cached movie for a key or None if
+        there isn't one
+        """
+        path = self._movie_path(key)
+        if not os.path.exists(path):
+            return None
+        # mark it as recently used:
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return path
+
+    def put(self, key, movie_path):
+        """
+        Add a copy of a movie to the cache, removing the least
+        recently used movies if the cache is over its size limit
+        """
+        self._ensure_root()
+        path = self._movie_path(key)
+        temp_path = "%s.%s.tmp" % (path, os.getpid())
+        shutil.copyfile(movie_path, temp_path)
+        if os.path.exists(path):
+            os.remove(path)
+        os.rename(temp_path, path)
+        self.evict()
+
+    def evict(self):
+        """
+        Remove the least recently used movies until the cache
+        is within its size limit
+        """
+        movies = []
+        total = 0
+        for name in os.listdir(self._root):
+            if not name.endswith(".mov"):
+                continue
+            path = os.path.join(self._root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            movies.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        for _, size, path in sorted(movies):
+            if total <= self._max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+    def _movie_path(self, key):
+        return os.path.join(self._root, "%s.mov" % key)
+
+    def _ensure_root(self):
+        if not os.path.isdir(self._root):
+            try:
+                os.makedirs(self._root)
+            except OSError:
+                # created by another process
+                if not os.path.isdir(self._root):
+                    raise
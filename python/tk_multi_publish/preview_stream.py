@@ -0,0 +1,288 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import os
+import sys
+import errno
+import shutil
+import tempfile
+import threading
+import subprocess
+import multiprocessing
+
+from .copy_engine import CopyEngine
+
+from .color_engine import ColorEngine
+
+try:
+    import OpenEXR
+    import Imath
+except ImportError:
+    # frames are decoded by ffmpeg instead
+    OpenEXR = None
+
+def h264_encode_args(preset="slow", crf=5):
+    """
+    Return the ffmpeg output arguments to encode an h264 preview with
+    """
+    return ["-vcodec", "libx264",
+            "-pix_fmt", "yuv420p",
+            "-preset", preset,
+            "-crf", str(crf),
+            "-vf", "scale=trunc(iw/2)*2:trunc(ih/2)*2,setsar=1/1"]
+
+# h264 settings that match the previews created from transcoded jpgs
+DEFAULT_ENCODE_ARGS = h264_encode_args()
+
+class PreviewError(Exception):
+    """
+    Raised when a preview movie can't be created
+    """
+
+class ExrFrameDecoder(object):
+    """
+    Decodes EXR frames in process into packed 8 bit sRGB pixels.  A decoder
+    reuses its buffers for every frame so each thread needs its own.
+    """
+
+    @staticmethod
+    def available():
+        return OpenEXR is not None and ColorEngine.available()
+
+    def __init__(self, use_lut=True):
+        """
+        Construction
+
+        :param use_lut: Convert to sRGB with lookup tables rather than
+                        evaluating the transfer function for every pixel
+        """
+        self._color_engine = ColorEngine(use_lut)
+
+    def size(self, path):
+        """
+        Return the (width, height) of a frame
+        """
+        window = OpenEXR.InputFile(path).header()["dataWindow"]
+        return window.max.x - window.min.x + 1, window.max.y - window.min.y + 1
+
+    def decode(self, path):
+        """
+        Return the pixels of a frame as a flat array of rgb24 data.  The
+        array is reused by the next call so must be consumed first.
+        """
+        exr_file = OpenEXR.InputFile(path)
+        header = exr_file.header()
+        window = header["dataWindow"]
+        width = window.max.x - window.min.x + 1
+        height = window.max.y - window.min.y + 1
+
+        channels = header["channels"]
+        channel_names = list(channels)
+        if all(name in channel_names for name in "RGB"):
+            channel_names = ["R", "G", "B"]
+        else:
+            # single channel image, e.g. a depth or luminance pass
+            channel_names = [sorted(channel_names)[0]] * 3
+
+        # read half channels as they are so they can go through the half LUT:
+        half = all(channels[name].type.v == Imath.PixelType.HALF for name in channel_names)
+        pixel_type = Imath.PixelType(Imath.PixelType.HALF if half else Imath.PixelType.FLOAT)
+        return self._color_engine.convert(exr_file.channels(channel_names, pixel_type),
+                                          width, height, half)
+
+class PreviewStream(object):
+    """
+    Creates a preview movie from an image sequence with a single ffmpeg
+    process.  Frames are written to the stdin of ffmpeg rather than
+    transcoded to temporary files first.
+
+    If OpenEXR and numpy are available EXR frames are decoded in process
+    and sent as raw sRGB pixels, otherwise the files themselves are sent
+    and decoded by ffmpeg.
+    """
+
+    # windows process creation flag that stops a console window appearing
+    CREATE_NO_WINDOW = 0x08000000
+
+    def __init__(self, ffmpeg="ffmpeg", frame_rate=24, encode_args=None, decoder_factory=None):
+        """
+        Construction
+
+        :param ffmpeg:      Path to the ffmpeg executable
+        :param frame_rate:  Frame rate of the movie
+        :param encode_args: List of ffmpeg output arguments, defaults to h264
+        :param decoder_factory: Optional function returning a new decoder for EXR
+                                frames, defaults to ExrFrameDecoder if OpenEXR is available
+        """
+        self._ffmpeg = ffmpeg
+        self._frame_rate = frame_rate
+        self._encode_args = list(DEFAULT_ENCODE_ARGS if encode_args is None else encode_args)
+        if decoder_factory is None and ExrFrameDecoder.available():
+            decoder_factory = ExrFrameDecoder
+        self._decoder_factory = decoder_factory
+
+    def command(self, movie_path, size=None, exr=True):
+        """
+        Return the ffmpeg command used to encode the movie.  size is the
+        (width, height) of the frames when they're decoded in process.  exr
+        is False when the frames are another format for ffmpeg to detect.
+        """
+        if size:
+            input_args = ["-f", "rawvideo",
+                          "-pix_fmt", "rgb24",
+                          "-s", "%dx%d" % size]
+        elif exr:
+            # linear EXR frames are converted to sRGB:
+            input_args = ["-f", "image2pipe",
+                          "-c:v", "exr",
+                          "-apply_trc", "iec61966_2_1"]
+        else:
+            input_args = ["-f", "image2pipe"]
+        return ([self._ffmpeg, "-loglevel", "error"]
+                + input_args
+                + ["-r", str(self._frame_rate), "-i", "-"]
+                + self._encode_args
+                + ["-r", str(self._frame_rate), "-y", movie_path])
+
+    def encode(self, paths, movie_path, progress_cb=None):
+        """
+        Encode a list of frame paths into a movie.
+
+        :param paths:       List of the frame paths in order
+        :param movie_path:  Path of the movie to write
+        :param progress_cb: Optional function called as progress_cb(completed, total)
+                            as each frame is sent to ffmpeg
+        """
+        paths = list(paths)
+        if not paths:
+            raise PreviewError("No frames to create a preview from")
+
+        exr = os.path.splitext(paths[0])[1].lower() == ".exr"
+        decoder = self._decoder_factory() if self._decoder_factory and exr else None
+        size = decoder.size(paths[0]) if decoder else None
+        cmd = self.command(movie_path, size, exr)
+
+        devnull = open(os.devnull, "wb")
+        try:
+            process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=devnull,
+                                       stderr=subprocess.PIPE, **self._popen_kwargs())
+
+            # read stderr while frames are written so ffmpeg can't block on it:
+            stderr = []
+            stderr_thread = threading.Thread(target=lambda: stderr.append(process.stderr.read()))
+            stderr_thread.daemon = True
+            stderr_thread.start()
+
+            try:
+                for index, path in enumerate(paths):
+                    process.stdin.write(self._read_frame(path, size, decoder))
+                    if progress_cb:
+                        progress_cb(index + 1, len(paths))
+                process.stdin.close()
+            except Exception as e:
+                if getattr(e, "errno", None) not in (errno.EPIPE, errno.EINVAL):
+                    process.kill()
+                    process.wait()
+                    raise
+                # ffmpeg has exited - the error is reported below
+
+            process.wait()
+            stderr_thread.join()
+        finally:
+            devnull.close()
+
+        if process.returncode != 0:
+            raise PreviewError("Failed to create preview movie: %s\n%s"
+                               % (b"".join(stderr).decode("utf-8", "replace"), " ".join(cmd)))
+
+    def encode_segmented(self, paths, movie_path, chunk_size, workers=None, progress_cb=None):
+        """
+        Encode a list of frame paths into a movie by splitting the frames
+        into chunks that are encoded in parallel, then joining the encoded
+        segments with ffmpeg's concat demuxer without encoding them again.
+
+        :param paths:       List of the frame paths in order
+        :param movie_path:  Path of the movie to write
+        :param chunk_size:  The number of frames in each segment
+        :param workers:     The number of segments to encode at the same time.  Each
+                            encoder is multi-threaded so this defaults to a quarter
+                            of the number of cores.
+        :param progress_cb: Optional function called as progress_cb(completed, total)
+                            as segments finish encoding
+        """
+        paths = list(paths)
+        if not paths:
+            raise PreviewError("No frames to create a preview from")
+        if len(paths) <= chunk_size:
+            return self.encode(paths, movie_path, progress_cb)
+
+        if not workers:
+            try:
+                workers = max(2, multiprocessing.cpu_count() // 4)
+            except NotImplementedError:
+                workers = 2
+
+        segment_dir = tempfile.mkdtemp(prefix="tk_preview_")
+        try:
+            ext = os.path.splitext(movie_path)[1]
+            segments = []
+            for index, start in enumerate(range(0, len(paths), chunk_size)):
+                segments.append((paths[start:start + chunk_size],
+                                 os.path.join(segment_dir, "segment_%05d%s" % (index, ext))))
+
+            def segment_progress(completed, total):
+                if progress_cb:
+                    progress_cb(min(completed * chunk_size, len(paths)), len(paths))
+
+            errors = CopyEngine(self.encode, workers).run(segments, segment_progress)
+            if errors:
+                raise PreviewError(errors[0][2])
+
+            # join the segments:
+            list_path = os.path.join(segment_dir, "segments.txt")
+            with open(list_path, "w") as f:
+                for _, segment_path in segments:
+                    f.write("file '%s'\n" % segment_path.replace("\\", "/").replace("'", "'\\''"))
+            cmd = [self._ffmpeg, "-loglevel", "error",
+                   "-f", "concat", "-safe", "0", "-i", list_path,
+                   "-c", "copy", "-y", movie_path]
+            process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                       stderr=subprocess.STDOUT, **self._popen_kwargs())
+            output = process.communicate()[0]
+            if process.returncode != 0:
+                raise PreviewError("Failed to join preview segments: %s\n%s"
+                                   % (output.decode("utf-8", "replace"), " ".join(cmd)))
+        finally:
+            shutil.rmtree(segment_dir, ignore_errors=True)
+
+    def _popen_kwargs(self):
+        """
+        Extra arguments for subprocess.Popen to stop a console window
+        appearing on Windows
+        """
+        if sys.platform != "win32":
+            return {}
+        startupinfo = subprocess.STARTUPINFO()
+        startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+        return {"startupinfo": startupinfo, "creationflags": PreviewStream.CREATE_NO_WINDOW}
+
+    def _read_frame(self, path, size, decoder):
+        """
+        Return the data written to ffmpeg for a frame
+        """
+        if not decoder:
+            with open(path, "rb") as f:
+                return f.read()
+
+        data = decoder.decode(path)
+        if len(data) != size[0] * size[1] * 3:
+            raise PreviewError("Frame %s doesn't have the same resolution as the first frame (%dx%d)"
+                               % ((path,) + size))
+        return data
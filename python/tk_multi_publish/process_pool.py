@@ -0,0 +1,135 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import threading
+import subprocess
+import multiprocessing
+
+try:
+    import Queue as queue
+except ImportError:
+    # python 3
+    import queue
+
+class ProcessError(Exception):
+    """
+    Raised when one of the commands run by a ProcessPool fails
+    """
+    def __init__(self, index, cmd, returncode, output):
+        Exception.__init__(self, "Command failed with exit code %s: %s\n%s"
+                           % (returncode, " ".join(cmd), output))
+        self.index = index
+        self.cmd = cmd
+        self.returncode = returncode
+        self.output = output
+
+class ProcessPool(object):
+    """
+    Runs a list of commands as subprocesses, with at most a fixed number
+    of them running at the same time.  Commands are started in order and
+    the pool stops as soon as one of them fails: no further commands are
+    started and the ones still running are killed.
+    """
+    def __init__(self, max_processes=None, popen_kwargs=None):
+        """
+        Construction
+
+        :param max_processes:   The number of commands to run at the same time,
+                                defaults to the number of cores
+        :param popen_kwargs:    Optional dictionary of extra arguments for
+                                subprocess.Popen, e.g. startupinfo
+        """
+        if not max_processes:
+            try:
+                max_processes = multiprocessing.cpu_count()
+            except NotImplementedError:
+                max_processes = 1
+        self._max_processes = max(1, max_processes)
+        self._popen_kwargs = popen_kwargs or {}
+
+    def run(self, commands, progress_cb=None):
+        """
+        Run all commands and wait for them to finish.
+
+        :param commands:    List of commands, each one a list of arguments
+        :param progress_cb: Optional function called as progress_cb(completed, total)
+                            from the calling thread as commands finish
+        :raises:            ProcessError for the first command that fails
+        """
+        commands = list(commands)
+        state = {"next": 0, "failure": None}
+        running = {}
+        lock = threading.Lock()
+        finished = queue.Queue()
+
+        def worker():
+            while True:
+                with lock:
+                    if state["failure"] or state["next"] >= len(commands):
+                        return
+                    index = state["next"]
+                    state["next"] += 1
+                    try:
+                        process = subprocess.Popen(commands[index],
+                                                   stdin=subprocess.PIPE,
+                                                   stdout=subprocess.PIPE,
+                                                   stderr=subprocess.STDOUT,
+                                                   **self._popen_kwargs)
+                    except OSError as e:
+                        state["failure"] = ProcessError(index, commands[index], None, str(e))
+                        self._kill(running)
+                        finished.put(index)
+                        return
+                    running[index] = process
+
+                output = process.communicate()[0]
+                with lock:
+                    del running[index]
+                    if process.returncode != 0 and not state["failure"]:
+                        state["failure"] = ProcessError(index, commands[index], process.returncode,
+                                                        output.decode("utf-8", "replace"))
+                        self._kill(running)
+                finished.put(index)
+
+        threads = [threading.Thread(target=worker)
+                   for _ in range(min(self._max_processes, len(commands)))]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+
+        completed = 0
+        while completed < len(commands):
+            try:
+                finished.get(timeout=0.1)
+            except queue.Empty:
+                if not any(thread.is_alive() for thread in threads):
+                    # stopped early after a failure
+                    break
+                continue
+            completed += 1
+            if progress_cb and not state["failure"]:
+                progress_cb(completed, len(commands))
+
+        for thread in threads:
+            thread.join()
+
+        if state["failure"]:
+            raise state["failure"]
+
+    def _kill(self, running):
+        """
+        Kill all running processes
+        """
+        for process in running.values():
+            try:
+                process.kill()
+            except OSError:
+                # already finished
+                pass
@@ -17,12 +17,10 @@ import tank
 from tank import TankError
 from tank.platform.qt import QtCore, QtGui
 
-from .progress import TaskProgressReporter
-from .publish_form import PublishForm
-
 from .output import PublishOutput
 from .item import Item
 from .task import Task
+from .ttl_cache import TtlCache
     
 class PublishHandler(object):
     """
@@ -45,6 +43,9 @@ class PublishHandler(object):
         self._app.agnostic_scene_contents = {'primary': None, 'secondary': []}
         self._app.initialized_from = None
         self._app.context_fields = {}
+
+        # task lists are reused for each drop onto the dialog:
+        self._shotgun_tasks = TtlCache(self._app.get_setting("shotgun_task_cache_ttl"))
         
         # validate the secondary outputs:
         unique_names = []
@@ -104,7 +105,23 @@ class PublishHandler(object):
     
     def get_shotgun_tasks(self):
         """
-        Pull a list of tasks from shotgun based on the current context
+        Pull a list of tasks from shotgun based on the current context.  The
+        list is cached for each context for a short time.
+        """
+        context = self._app.context
+        key = tuple((entity["type"], entity["id"]) if entity else None
+                    for entity in [context.project, context.entity, context.step])
+        return [dict(sg_task) for sg_task in self._shotgun_tasks.get_or_create(key, self._find_shotgun_tasks)]
+
+    def forget_shotgun_tasks(self):
+        """
+        Forget the cached task lists, e.g. when the context changes
+        """
+        self._shotgun_tasks.clear()
+
+    def _find_shotgun_tasks(self):
+        """
+        Find the tasks for the current context in shotgun
         """
         filters = []
         if self._app.context.entity is None:
@@ -163,6 +180,7 @@ class PublishHandler(object):
         comment = publish_form.comment
         
         # create progress reporter and connect to UI:
+        from .progress import TaskProgressReporter
         progress = TaskProgressReporter(selected_tasks)
         publish_form.set_progress_reporter(progress)
 
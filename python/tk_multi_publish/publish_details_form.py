@@ -11,7 +11,6 @@
 import tank
 from tank.platform.qt import QtCore, QtGui
 import traceback
-import pyseq
 import os
 from string import digits
 
@@ -125,7 +124,6 @@ class PublishDetailsForm(QtGui.QWidget):
         if len(paths) == 1:
 
             file_name = paths[0]
-            file_folder = os.path.dirname(file_name)
 
             plausible_sequence = self._app.detect_image_sequence(file_name)
             if len(plausible_sequence) != 0:
@@ -136,10 +134,8 @@ class PublishDetailsForm(QtGui.QWidget):
                 answare = QtGui.QMessageBox.warning(None, 'Detected Sequence', message, buttons)
 
                 if answare == QtGui.QMessageBox.Yes:
-                    sequences = pyseq.get_sequences(plausible_sequence)
-                    for seq in sequences:
-                        file_name = os.path.join(file_folder, seq.format("%h%p%t"))
-                        self.store_item(file_name, 'sequence')
+                    seq = self._app.detect_sequence(file_name)
+                    self.store_item(seq.format_path(), 'sequence')
                 else:
                     self.store_item(file_name, 'single')
             else:
@@ -148,14 +144,11 @@ class PublishDetailsForm(QtGui.QWidget):
         elif len(paths) > 1:
 
             #try to identify sequences
-            sequences = pyseq.get_sequences(paths)
+            sequences, singles = self._app.detect_sequences(paths)
             for seq in sequences:
-                file_name = os.path.join(os.path.dirname(seq.path()), seq.format("%h%p%t"))
-
-                if '%' in file_name:
-                    self.store_item(file_name, 'sequence')
-                else:
-                    self.store_item(file_name, 'single')
+                self.store_item(seq.format_path(), 'sequence')
+            for file_name in singles:
+                self.store_item(file_name, 'single')
 
         else:
             QtGui.QMessageBox.warning(None, "File Warning!", "Not working for now!")
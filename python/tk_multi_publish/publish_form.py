@@ -154,6 +154,7 @@ class PublishForm(QtGui.QWidget):
         self._ui.pages.setCurrentWidget(self._ui.publish_result)
         self._ui.publish_result.status = success
         self._ui.publish_result.errors = errors
+        self._ui.publish_result.upload_queue = self._app.upload_queue
         
     def _initialize(self):
         """
@@ -0,0 +1,262 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import os
+import re
+import json
+import hashlib
+import threading
+
+from .copy_engine import CopyEngine
+
+# frame specifiers that can appear in a sequence publish path
+FRAME_SPEC_REGEX = re.compile(r"[._]?(%0?\d*d|#+|@+)")
+
+def hash_file(path, block_size=1024 * 1024):
+    """
+    Return the sha1 hex digest of the contents of a file
+    """
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            digest.update(block)
+    return digest.hexdigest()
+
+class FrameHashes(object):
+    """
+    Content hashes of files remembered against their size and modification
+    time for the session, so frames that are published and also made into
+    a preview, or published again unchanged, are only read once.
+    """
+
+    def __init__(self):
+        """
+        Construction
+        """
+        # path -> (size, mtime, hash)
+        self._hashes = {}
+        self._lock = threading.Lock()
+
+    def remember(self, path, size, mtime, content_hash):
+        """
+        Store the hash of a file, e.g. one read from a manifest
+        """
+        with self._lock:
+            self._hashes[path] = (size, mtime, content_hash)
+
+    def get(self, path, size=None, mtime=None):
+        """
+        Return the hash of a file, reading the file if its hash isn't
+        known for its current size and modification time
+
+        :param path:    The path of the file
+        :param size:    The size of the file if it is already known
+        :param mtime:   The modification time of the file if it is already known
+        """
+        if size is None or mtime is None:
+            stat = os.stat(path)
+            size, mtime = stat.st_size, stat.st_mtime
+        with self._lock:
+            entry = self._hashes.get(path)
+        if entry and entry[0] == size and entry[1] == mtime:
+            return entry[2]
+        content_hash = hash_file(path)
+        self.remember(path, size, mtime, content_hash)
+        return content_hash
+
+    def get_all(self, paths, workers=1):
+        """
+        Return the hashes of a list of files, in order, reading any that
+        aren't known with a pool of threads
+
+        :param paths:   List of file paths
+        :param workers: The number of threads to read the files with
+        """
+        paths = list(paths)
+        hashes = [None] * len(paths)
+
+        def hash_path(path, index):
+            hashes[index] = self.get(path)
+
+        errors = CopyEngine(hash_path, workers).run((path, index) for index, path in enumerate(paths))
+        if errors:
+            raise IOError("Failed to read %s - %s" % (errors[0][0], errors[0][2]))
+        return hashes
+
+    def clear(self):
+        with self._lock:
+            self._hashes = {}
+
+class PublishManifest(object):
+    """
+    Record of the frames written for a published sequence.  For every
+    frame this stores the source and published paths together with the
+    size, modification time and content hash of the source file so that
+    a later version can tell which frames have changed.
+
+    The manifest is saved as a json file next to the published frames.
+    """
+
+    SUFFIX = ".manifest.json"
+
+    def __init__(self, publish_path, frames=None):
+        """
+        Construction
+
+        :param publish_path:    The publish path of the sequence, e.g. /path/to/render.%04d.exr
+        :param frames:          Optional dictionary of frame number -> entry
+        """
+        self._publish_path = publish_path
+        self._frames = frames or {}
+
+    @staticmethod
+    def path_for(publish_path):
+        """
+        Return the path of the manifest file for a sequence publish path
+        """
+        folder, file_name = os.path.split(publish_path)
+        name = os.path.splitext(FRAME_SPEC_REGEX.sub("", file_name))[0]
+        return os.path.join(folder, name + PublishManifest.SUFFIX)
+
+    @staticmethod
+    def is_published(publish_path, listdir=os.listdir):
+        """
+        Return True if any frames of a sequence publish path exist
+
+        :param publish_path:    The publish path of the sequence, e.g. /path/to/render.%04d.exr
+        :param listdir:         Function returning the names of the entries in a folder
+        """
+        folder, file_name = os.path.split(publish_path)
+        parts = FRAME_SPEC_REGEX.split(file_name, 1)
+        prefix, suffix = parts[0], parts[-1] if len(parts) > 1 else ""
+        try:
+            names = listdir(folder or ".")
+        except OSError:
+            return False
+        return any(name.startswith(prefix) and name.endswith(suffix)
+                   and not name.endswith(PublishManifest.SUFFIX) for name in names)
+
+    @classmethod
+    def load(cls, publish_path):
+        """
+        Load the manifest written for a sequence publish path.
+
+        :returns:   A PublishManifest or None if there isn't a readable
+                    manifest for the path
+        """
+        try:
+            with open(PublishManifest.path_for(publish_path), "r") as f:
+                data = json.load(f)
+        except (IOError, OSError, ValueError):
+            return None
+        frames = dict((int(frame), entry) for frame, entry in data.get("frames", {}).items())
+        return cls(publish_path, frames)
+
+    @property
+    def publish_path(self):
+        return self._publish_path
+
+    @property
+    def frames(self):
+        return sorted(self._frames)
+
+    def get(self, frame):
+        """
+        Return the entry for a frame or None if it isn't in the manifest
+        """
+        return self._frames.get(frame)
+
+    def set(self, frame, source_path, path, size, mtime, content_hash):
+        """
+        Add or replace the entry for a frame
+        """
+        self._frames[frame] = {"source": source_path,
+                               "path": path,
+                               "size": size,
+                               "mtime": mtime,
+                               "hash": content_hash}
+
+    def save(self):
+        """
+        Write the manifest next to the published frames
+        """
+        data = {"publish_path": self._publish_path,
+                "frames": dict((str(frame), entry) for frame, entry in self._frames.items())}
+        with open(PublishManifest.path_for(self._publish_path), "w") as f:
+            json.dump(data, f, indent=1, sort_keys=True)
+
+def plan_delta_publish(frames, publish_path, previous=None, workers=1, frame_hashes=None):
+    """
+    Work out which frames of a sequence need copying to publish it again.
+
+    A frame is unchanged when the previous manifest has the same source,
+    size and modification time for it, or the same size and content hash,
+    and the previously published frame still exists.  Every other frame is
+    hashed, including on the first publish, so that the manifest always
+    holds the hashes for the next version to compare against.
+
+    :param frames:          List of (frame, source_path, target_path) tuples
+    :param publish_path:    The publish path of the new sequence
+    :param previous:        The PublishManifest of the previous version, if there is one
+    :param workers:         The number of threads to hash frames with
+    :param frame_hashes:    Optional FrameHashes to reuse hashes from and add them to
+    :returns:               A (manifest, link_frames, copy_frames) tuple where manifest
+                            is the PublishManifest for the new version, link_frames is a
+                            list of (previous_path, source_path, target_path) tuples for
+                            unchanged frames and copy_frames is a list of (source_path,
+                            target_path) tuples for frames that need copying
+    """
+    if frame_hashes is None:
+        frame_hashes = FrameHashes()
+
+    stats = {}
+    hashes = {}
+    unchanged = set()
+    to_hash = []
+    for frame, source_path, target_path in frames:
+        stat = os.stat(source_path)
+        stats[frame] = (stat.st_size, stat.st_mtime)
+        entry = previous.get(frame) if previous else None
+        if (entry and entry.get("source") == source_path and entry["size"] == stat.st_size
+            and entry["mtime"] == stat.st_mtime):
+            # the file hasn't been touched:
+            unchanged.add(frame)
+            if entry["hash"]:
+                hashes[frame] = entry["hash"]
+                frame_hashes.remember(source_path, stat.st_size, stat.st_mtime, entry["hash"])
+                continue
+        to_hash.append((source_path, frame))
+
+    def hash_frame(source_path, frame):
+        size, mtime = stats[frame]
+        hashes[frame] = frame_hashes.get(source_path, size, mtime)
+
+    errors = CopyEngine(hash_frame, workers).run(to_hash)
+    if errors:
+        raise IOError("Failed to read %s - %s" % (errors[0][0], errors[0][2]))
+
+    manifest = PublishManifest(publish_path)
+    link_frames = []
+    copy_frames = []
+    for frame, source_path, target_path in frames:
+        size, mtime = stats[frame]
+        manifest.set(frame, source_path, target_path, size, mtime, hashes[frame])
+
+        entry = previous.get(frame) if previous else None
+        if (entry and (frame in unchanged or (entry["size"] == size and entry["hash"] == hashes[frame]))
+            and os.path.exists(entry["path"])):
+            link_frames.append((entry["path"], source_path, target_path))
+        else:
+            copy_frames.append((source_path, target_path))
+
+    return manifest, link_frames, copy_frames
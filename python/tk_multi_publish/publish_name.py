@@ -0,0 +1,153 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import os
+import re
+
+# characters that separate the parts of a file name
+DELIMITERS = "_-. "
+
+_TOKEN_RE = re.compile(r"\{([^}]+)\}|(\[)|(\])|([^{}\[\]]+)")
+
+class PublishNameFormatter(object):
+    """
+    Builds the 'name' of a publish - the file name without its extension
+    and with the version (and any other keys that change between
+    publishes of the same thing) removed.
+
+    The file name part of the template definition is parsed once when the
+    formatter is built so names are put together directly from the fields
+    rather than rebuilding the whole path with the template and searching
+    it for the version.
+    """
+
+    def __init__(self, template, strip_keys=("version",)):
+        """
+        Construction
+
+        :param template:    The template the publish paths are built with
+        :param strip_keys:  The keys to remove from the name, in order
+        """
+        self._keys = template.keys
+        self._strip_keys = tuple(strip_keys)
+        definition = template.definition.replace("\\", "/")
+        file_definition, _ = os.path.splitext(definition.split("/")[-1])
+        self._tokens = _parse(file_definition)
+        self._strips = any(key in self._strip_keys for key in _token_keys(self._tokens))
+
+    def format(self, fields, path=None):
+        """
+        Return the name for a publish.
+
+        :param fields:  The fields of the publish path
+        :param path:    The publish path.  If there isn't anything to remove from
+                        the name it is taken from the path as it is.
+        """
+        if path and not self._strips:
+            name, _ = os.path.splitext(os.path.basename(path))
+            return name
+
+        pieces = []
+        positions = {}
+        self._build(self._tokens, fields, pieces, positions)
+
+        for key in self._strip_keys:
+            index = positions.get(key)
+            if index is None:
+                continue
+            original = list(pieces)
+            pieces[index] = ""
+            if key == "version":
+                # remove any preceding 'v'
+                _rstrip(pieces, index, "v")
+            pre_str = "".join(pieces[:index])
+            post_str = "".join(pieces[index + 1:])
+            if pre_str and post_str and pre_str[-1] in DELIMITERS and post_str[0] in DELIMITERS:
+                # only want one delimiter - strip the second one:
+                _lstrip(pieces, index + 1, DELIMITERS)
+            _lstrip(pieces, 0, DELIMITERS)
+            _rstrip(pieces, len(pieces), DELIMITERS)
+
+            if not "".join(pieces):
+                # likely that the key is the only thing in the name so
+                # replace it with a placeholder instead:
+                pieces = original
+                pieces[index] = self._placeholder(key)
+
+        return "".join(pieces)
+
+    def _build(self, tokens, fields, pieces, positions):
+        for kind, value in tokens:
+            if kind == "text":
+                pieces.append(value)
+            elif kind == "key":
+                if value in self._strip_keys:
+                    positions[value] = len(pieces)
+                pieces.append(self._keys[value].str_from_value(fields.get(value)))
+            elif all(fields.get(key) is not None for key in _token_keys(value)):
+                # optional section with all of its keys set
+                self._build(value, fields, pieces, positions)
+
+    def _placeholder(self, key):
+        if key == "version":
+            return "#" * len(self._keys[key].str_from_value(0))
+        return key
+
+def _parse(definition):
+    """
+    Split a template definition into a list of (kind, value) tokens where
+    kind is 'text', 'key' or 'optional', the value of an optional token
+    being the list of tokens inside the brackets
+    """
+    stack = [[]]
+    for match in _TOKEN_RE.finditer(definition):
+        key, opening, closing, text = match.groups()
+        if key:
+            stack[-1].append(("key", key))
+        elif opening:
+            stack.append([])
+        elif closing and len(stack) > 1:
+            tokens = stack.pop()
+            stack[-1].append(("optional", tokens))
+        elif text:
+            stack[-1].append(("text", text))
+    while len(stack) > 1:
+        # unbalanced brackets
+        tokens = stack.pop()
+        stack[-1].append(("optional", tokens))
+    return stack[0]
+
+def _token_keys(tokens):
+    for kind, value in tokens:
+        if kind == "key":
+            yield value
+        elif kind == "optional":
+            for key in _token_keys(value):
+                yield key
+
+def _rstrip(pieces, end, chars):
+    """
+    Strip chars from the end of the pieces before index end
+    """
+    for index in range(end - 1, -1, -1):
+        stripped = pieces[index].rstrip(chars)
+        pieces[index] = stripped
+        if stripped:
+            break
+
+def _lstrip(pieces, start, chars):
+    """
+    Strip chars from the start of the pieces from index start
+    """
+    for index in range(start, len(pieces)):
+        stripped = pieces[index].lstrip(chars)
+        pieces[index] = stripped
+        if stripped:
+            break
@@ -10,6 +10,8 @@
 
 import tank
 from tank.platform.qt import QtCore, QtGui
+
+from .upload_queue import UploadJob
  
 class PublishResultForm(QtGui.QWidget):
     """
@@ -33,6 +35,16 @@ class PublishResultForm(QtGui.QWidget):
         self._ui.setupUi(self)
         
         self._ui.close_btn.clicked.connect(self._on_close)
+
+        # status of the uploads still running in the background:
+        self._upload_queue = None
+        self._upload_status = QtGui.QLabel(self)
+        self._upload_status.setWordWrap(True)
+        self._upload_status.setVisible(False)
+        self._ui.verticalLayout_3.addWidget(self._upload_status)
+        self._upload_timer = QtCore.QTimer(self)
+        self._upload_timer.setInterval(500)
+        self._upload_timer.timeout.connect(self._update_upload_status)
         
         self._update_ui()
         
@@ -53,9 +65,46 @@ class PublishResultForm(QtGui.QWidget):
         self._errors = value
         self._update_ui()
     errors=property(__get_errors, __set_errors)
+
+    # @property
+    def __get_upload_queue(self):
+        return self._upload_queue
+    # @upload_queue.setter
+    def __set_upload_queue(self, value):
+        self._upload_queue = value
+        self._update_upload_status()
+        if value:
+            self._upload_timer.start()
+        else:
+            self._upload_timer.stop()
+    upload_queue=property(__get_upload_queue, __set_upload_queue)
         
     def _on_close(self):
+        self._upload_timer.stop()
         self.close.emit()
+
+    def _update_upload_status(self):
+        """
+        Show the progress of the background uploads
+        """
+        jobs = self._upload_queue.jobs() if self._upload_queue else []
+        self._upload_status.setVisible(bool(jobs))
+        if not jobs:
+            return
+
+        summary = self._upload_queue.summary()
+        lines = ["Uploads to Shotgun: %d waiting, %d uploading, %d done, %d failed"
+                 % (summary[UploadJob.PENDING], summary[UploadJob.UPLOADING],
+                    summary[UploadJob.DONE], summary[UploadJob.FAILED])]
+        for job in jobs:
+            if job.state == UploadJob.UPLOADING and job.bytes_total:
+                lines.append("%s: %d%%" % (job.label, (100 * job.bytes_sent) // job.bytes_total))
+            elif job.state == UploadJob.FAILED:
+                lines.append("%s failed: %s" % (job.label, job.error))
+        self._upload_status.setText("\n".join(lines))
+
+        if not self._upload_queue.is_busy():
+            self._upload_timer.stop()
         
     def _update_ui(self):
         self._ui.status_icon.setPixmap(QtGui.QPixmap([":/res/failure.png", ":/res/success.png"][self._status]))
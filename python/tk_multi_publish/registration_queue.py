@@ -0,0 +1,245 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import re
+
+# the first version of core whose register_publish does a dry run.  Older
+# versions accept any keyword argument so they would register the publish
+# for real rather than reject the argument:
+DRY_RUN_CORE_VERSION = (0, 19, 0)
+
+def supports_dry_run(core_version):
+    """
+    Return True if register_publish in a version of core can do a dry run
+
+    :param core_version:    The version of core, e.g. v0.19.18
+    """
+    numbers = re.findall(r"\d+", core_version or "")
+    if not numbers:
+        # e.g. a development version of core
+        return False
+    return tuple(int(n) for n in numbers[:3]) >= DRY_RUN_CORE_VERSION
+
+class PendingRegistration(object):
+    """
+    A publish waiting to be registered by a RegistrationQueue
+    """
+    def __init__(self, task, args, callback):
+        self.task = task
+        self.args = args
+        self.callback = callback
+        self.entity_type = None
+        self.data = None
+        self.sg_publish = None
+
+class RegistrationQueue(object):
+    """
+    Collects the publishes to register for a number of tasks and registers
+    them in chunks with a single Shotgun batch request per chunk, rather
+    than a round trip for every publish.
+
+    The data for each publish is built by register_publish in dry run mode
+    so it is identical to registering the publish directly.  Versions of
+    core that can't do a dry run register each publish on its own.  If a
+    chunk can't be registered as a batch its publishes are registered one
+    at a time so that errors are reported against the right task.
+    """
+
+    # dependency entity and fields for each published file entity type
+    DEPENDENCY_FIELDS = {"PublishedFile": ("PublishedFileDependency",
+                                           "published_file",
+                                           "dependent_published_file"),
+                         "TankPublishedFile": ("TankDependency",
+                                               "tank_published_file",
+                                               "dependent_tank_published_file")}
+
+    def __init__(self, tk, register_fn, find_publish_fn, chunk_size=50, thumbnail_fn=None, dry_run=False):
+        """
+        Construction
+
+        :param tk:              The Toolkit API instance to register publishes with
+        :param register_fn:     Function to register a publish, i.e. tank.util.register_publish
+        :param find_publish_fn: Function to find publishes by path, i.e. tank.util.find_publish
+        :param chunk_size:      The maximum number of publishes in each batch request
+        :param thumbnail_fn:    Optional function called as thumbnail_fn(entities, path) to
+                                set the thumbnail of a list of publishes with one request,
+                                e.g. ThumbnailSharer.attach.  Thumbnails are uploaded to
+                                each publish if this isn't set.
+        :param dry_run:         True if register_fn can do a dry run, see supports_dry_run
+        """
+        self._tk = tk
+        self._register_fn = register_fn
+        self._find_publish_fn = find_publish_fn
+        self._chunk_size = max(1, chunk_size)
+        self._thumbnail_fn = thumbnail_fn
+        self._dry_run = dry_run
+        self._pending = []
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, task, args, callback=None):
+        """
+        Queue a publish to be registered.
+
+        :param task:        The task the publish is for, used to report errors
+        :param args:        Dictionary of keyword arguments for register_publish
+        :param callback:    Optional function called as callback(sg_publish) with the
+                            registered publish once it has been created
+        """
+        self._pending.append(PendingRegistration(task, args, callback))
+
+    def flush(self, progress_cb=None):
+        """
+        Register all queued publishes.
+
+        :param progress_cb: Optional function called as progress_cb(completed, total)
+                            as publishes are registered
+        :returns:           A list of (task, error message) tuples for all
+                            publishes that failed to register
+        """
+        pending, self._pending = self._pending, []
+        errors = []
+        for start in range(0, len(pending), self._chunk_size):
+            chunk = pending[start:start + self._chunk_size]
+            errors.extend(self._register_chunk(chunk))
+            if progress_cb:
+                progress_cb(start + len(chunk), len(pending))
+        return errors
+
+    def _register_chunk(self, chunk):
+        """
+        Register a chunk of publishes, returning a list of errors
+        """
+        batched = []
+        single = []
+        for item in chunk:
+            if not self._dry_run:
+                single.append(item)
+                continue
+            try:
+                data = dict(self._register_fn(dry_run=True, **item.args))
+            except Exception:
+                single.append(item)
+                continue
+            if data.get("id"):
+                # the dry run was ignored and the publish registered,
+                # along with its dependencies and thumbnail:
+                item.sg_publish = data
+                item.entity_type = data.get("type", "PublishedFile")
+                continue
+            item.entity_type = data.pop("type", "PublishedFile")
+            data.pop("id", None)
+            item.data = data
+            batched.append(item)
+
+        errors = []
+        if batched:
+            try:
+                requests = [{"request_type": "create", "entity_type": item.entity_type, "data": item.data}
+                            for item in batched]
+                for item, sg_publish in zip(batched, self._tk.shotgun.batch(requests)):
+                    item.sg_publish = sg_publish
+            except Exception:
+                # fall back to registering them one at a time to find
+                # out which ones failed:
+                single.extend(batched)
+                batched = []
+
+        if batched:
+            errors.extend(self._link_dependencies(batched))
+            errors.extend(self._upload_thumbnails(batched))
+
+        registered = []
+        for item in single:
+            args = item.args
+            if self._thumbnail_fn:
+                # the thumbnail is shared below rather than uploaded again:
+                args = dict(args, thumbnail_path=None)
+            try:
+                item.sg_publish = self._register_fn(**args)
+            except Exception as e:
+                errors.append((item.task, "Failed to register publish: %s" % e))
+                continue
+            item.entity_type = item.sg_publish.get("type", "PublishedFile")
+            registered.append(item)
+        if registered and self._thumbnail_fn:
+            errors.extend(self._upload_thumbnails(registered))
+
+        for item in chunk:
+            if item.sg_publish and item.callback:
+                try:
+                    item.callback(item.sg_publish)
+                except Exception as e:
+                    errors.append((item.task, "%s" % e))
+        return errors
+
+    def _link_dependencies(self, items):
+        """
+        Create the dependencies of a batch of newly created publishes with
+        a single batch request
+        """
+        dependency_paths = set()
+        for item in items:
+            dependency_paths.update(item.args.get("dependency_paths") or [])
+        dependencies = self._find_publish_fn(self._tk, list(dependency_paths)) if dependency_paths else {}
+
+        requests = []
+        owners = []
+        for item in items:
+            entity_type, field, dependent_field = RegistrationQueue.DEPENDENCY_FIELDS.get(
+                item.entity_type, RegistrationQueue.DEPENDENCY_FIELDS["PublishedFile"])
+            dependency_ids = list(item.args.get("dependency_ids") or [])
+            for path in item.args.get("dependency_paths") or []:
+                if path in dependencies:
+                    dependency_ids.append(dependencies[path]["id"])
+            for dependency_id in dependency_ids:
+                requests.append({"request_type": "create",
+                                 "entity_type": entity_type,
+                                 "data": {field: item.sg_publish,
+                                          dependent_field: {"type": item.entity_type, "id": dependency_id}}})
+                owners.append(item)
+
+        if not requests:
+            return []
+        try:
+            self._tk.shotgun.batch(requests)
+        except Exception as e:
+            return [(item.task, "Failed to create publish dependencies: %s" % e)
+                    for item in items if item in owners]
+        return []
+
+    def _upload_thumbnails(self, items):
+        """
+        Set the thumbnails of a batch of newly created publishes, with a
+        single request for all the publishes that share a thumbnail
+        """
+        by_path = {}
+        for item in items:
+            thumbnail_path = item.args.get("thumbnail_path")
+            if thumbnail_path:
+                by_path.setdefault(thumbnail_path, []).append(item)
+
+        errors = []
+        for thumbnail_path, path_items in by_path.items():
+            if self._thumbnail_fn:
+                try:
+                    self._thumbnail_fn([{"type": item.entity_type, "id": item.sg_publish["id"]}
+                                        for item in path_items], thumbnail_path)
+                except Exception as e:
+                    errors.extend((item.task, "Failed to upload thumbnail: %s" % e) for item in path_items)
+                continue
+
+            for item in path_items:
+                try:
+                    self._tk.shotgun.upload_thumbnail(item.entity_type, item.sg_publish["id"], thumbnail_path)
+                except Exception as e:
+                    errors.append((item.task, "Failed to upload thumbnail: %s" % e))
+        return errors
@@ -0,0 +1,183 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import os
+
+from .frame_set import FrameSet
+
+DIGITS = "0123456789"
+
+def split_frame(file_name):
+    """
+    Split a file name into (head, frame, tail) where frame is the frame
+    number string, e.g. render.0001.exr -> ("render.", "0001", ".exr").
+    The frame number is the last run of digits before the extension.
+    Returns None if the name doesn't contain a frame number.
+    """
+    # str.rstrip is several times faster than a regular expression and
+    # this runs for every file in a folder
+    base, dot, ext = file_name.rpartition(".")
+    if dot:
+        head = base.rstrip(DIGITS)
+        if len(head) != len(base):
+            return head, base[len(head):], dot + ext
+
+    # no frame number before the extension, e.g. render0001
+    head = file_name.rstrip(DIGITS)
+    if len(head) == len(file_name) or "." in head.lstrip("."):
+        # no digits or the digits are the file extension, e.g. file.123
+        return None
+    return head, file_name[len(head):], ""
+
+class ImageSequence(object):
+    """
+    A sequence of frames sharing the same folder, head and tail.  Only
+    the frame numbers are stored, paths are generated when needed.
+    """
+    def __init__(self, folder, head, tail, frames, padding):
+        """
+        Construction
+
+        :param folder:  The folder containing the frames
+        :param head:    The part of the file name before the frame number
+        :param tail:    The part of the file name after the frame number
+        :param frames:  FrameSet of the frame numbers
+        :param padding: Number of digits frame numbers are padded to
+        """
+        self.folder = folder
+        self.head = head
+        self.tail = tail
+        self.frames = frames
+        self.padding = padding
+
+    def __len__(self):
+        return len(self.frames)
+
+    def length(self):
+        return len(self.frames)
+
+    def start(self):
+        return self.frames.start()
+
+    def end(self):
+        return self.frames.end()
+
+    def missing(self):
+        """
+        Return a FrameSet of the frame numbers missing between the
+        start and end of the sequence
+        """
+        return self.frames.missing()
+
+    def format_path(self):
+        """
+        Return the path of the sequence with a printf style frame
+        specifier, e.g. /path/to/render.%04d.exr
+        """
+        return os.path.join(self.folder, "%s%%0%dd%s" % (self.head, self.padding, self.tail))
+
+    def path(self, frame):
+        """
+        Return the path to a single frame
+        """
+        return os.path.join(self.folder, "%s%0*d%s" % (self.head, self.padding, frame, self.tail))
+
+    def iter_frames(self):
+        """
+        Generate (frame, path) tuples for all frames in order
+        """
+        for frame in self.frames:
+            yield frame, self.path(frame)
+
+    def iter_paths(self):
+        """
+        Generate the paths to all frames in order
+        """
+        for _, path in self.iter_frames():
+            yield path
+
+    def paths(self):
+        """
+        Return the paths to all frames in order
+        """
+        return list(self.iter_paths())
+
+class SequenceIndex(object):
+    """
+    Groups file names into image sequences in a single pass so that the
+    sequence a file belongs to can then be looked up directly.
+    """
+    def __init__(self, paths=None):
+        """
+        Construction
+
+        :param paths:   Optional list of file paths to index
+        """
+        # (folder, head, tail) -> ImageSequence
+        self._sequences = {}
+        if paths:
+            groups = {}
+            for path in paths:
+                folder, file_name = os.path.split(path)
+                self._add(groups, os.path.normpath(folder), file_name)
+            self._build(groups)
+
+    @classmethod
+    def from_folder(cls, folder, file_names):
+        """
+        Build an index for a list of file names in a single folder
+        """
+        index = cls()
+        folder = os.path.normpath(folder)
+        groups = {}
+        for file_name in file_names:
+            index._add(groups, folder, file_name)
+        index._build(groups)
+        return index
+
+    def find(self, path):
+        """
+        Return the ImageSequence that a path belongs to.  The path
+        doesn't need to exist but has to contain a frame number.
+
+        :returns:   An ImageSequence or None if the path doesn't belong
+                    to a sequence in the index
+        """
+        folder, file_name = os.path.split(path)
+        parts = split_frame(file_name)
+        if not parts:
+            return None
+        return self._sequences.get((os.path.normpath(folder), parts[0], parts[2]))
+
+    def sequences(self):
+        """
+        Return all sequences in the index ordered by path
+        """
+        return [self._sequences[key] for key in sorted(self._sequences)]
+
+    def _add(self, groups, folder, file_name):
+        """
+        Add a file to the group for its sequence
+        """
+        parts = split_frame(file_name)
+        if parts:
+            head, frame, tail = parts
+            frames = groups.get((folder, head, tail))
+            if frames is None:
+                frames = groups[(folder, head, tail)] = {}
+            frames[int(frame)] = frame
+
+    def _build(self, groups):
+        """
+        Create the sequences from the grouped frames
+        """
+        for (folder, head, tail), frames in groups.items():
+            padding = min(len(frame) for frame in frames.values())
+            self._sequences[(folder, head, tail)] = ImageSequence(folder, head, tail, FrameSet(frames), padding)
@@ -10,16 +10,32 @@
 
 from tank.platform.qt import QtCore
 
-class Task(QtCore.QObject):
+try:
+    _QObject = QtCore.QObject
+    _Signal = QtCore.Signal
+except AttributeError:
+    # Qt isn't available when publishing in batch, where
+    # nothing listens for tasks being modified:
+    class _QObject(object):
+        pass
+
+    class _Signal(object):
+        def connect(self, slot):
+            pass
+
+        def emit(self, *args):
+            pass
+
+class Task(_QObject):
     """
     Encapsulates a task for use internally within 
     the app - this is converted and passed as a
     dictionary to any hooks.
     """
-    modified = QtCore.Signal()
+    modified = _Signal()
     
     def __init__(self, item, output):
-        QtCore.QObject.__init__(self)
+        _QObject.__init__(self)
         self._item = item
         self._output = output
         self._pre_publish_errors = []
@@ -62,5 +78,9 @@ class Task(QtCore.QObject):
                 "output":{"name":self._output.name, 
                           "publish_template":self._output.publish_template,
                           "tank_type":self._output.tank_type,
+                          "copy_threads":self._output.copy_threads,
+                          "preview_mode":self._output.preview_mode,
+                          "preview_chunk_size":self._output.preview_chunk_size,
+                          "preview_preset":self._output.preview_preset,
                           }
                 }
\ No newline at end of file
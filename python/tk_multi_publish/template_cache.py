@@ -0,0 +1,114 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import threading
+import collections
+
+class TemplateCache(object):
+    """
+    Remembers the results of parsing paths with templates and building
+    paths from fields, so the same path or fields only go through the
+    template once per session however many times the dialog is rebuilt
+    or hooks ask for them.  Each kind of result is bounded in number and
+    the least recently used are forgotten first.
+    """
+
+    def __init__(self, max_entries=10000):
+        """
+        Construction
+
+        :param max_entries: The most parsed paths, and the most built paths,
+                            to remember
+        """
+        self._max_entries = max(1, max_entries)
+        self._fields = collections.OrderedDict()
+        self._paths = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def clear(self):
+        """
+        Forget all remembered results
+        """
+        with self._lock:
+            self._fields = collections.OrderedDict()
+            self._paths = collections.OrderedDict()
+
+    def get_fields(self, template, path):
+        """
+        Equivalent of template.get_fields(path).  A new dictionary is
+        returned each time so callers are free to modify it.
+        """
+        key = (self._template_key(template), path)
+        with self._lock:
+            entry = self._lookup(self._fields, key)
+        if entry is None:
+            try:
+                entry = (template.get_fields(path), None)
+            except Exception as e:
+                entry = (None, e)
+            with self._lock:
+                self._store(self._fields, key, entry)
+
+        fields, error = entry
+        if error is not None:
+            raise error
+        return dict(fields)
+
+    def validate(self, template, path):
+        """
+        Equivalent of template.validate(path) - True if the path
+        can be parsed by the template
+        """
+        try:
+            self.get_fields(template, path)
+        except Exception:
+            return False
+        return True
+
+    def apply_fields(self, template, fields):
+        """
+        Equivalent of template.apply_fields(fields)
+        """
+        try:
+            key = (self._template_key(template), frozenset(fields.items()))
+        except TypeError:
+            # unhashable field values
+            return template.apply_fields(fields)
+
+        with self._lock:
+            path = self._lookup(self._paths, key)
+        if path is None:
+            path = template.apply_fields(fields)
+            with self._lock:
+                self._store(self._paths, key, path)
+        return path
+
+    def _lookup(self, results, key):
+        """
+        Return a remembered result, marking it as recently used.  The
+        lock must be held.
+        """
+        value = results.pop(key, None)
+        if value is not None:
+            results[key] = value
+        return value
+
+    def _store(self, results, key, value):
+        """
+        Remember a result, forgetting the least recently used if there
+        are too many.  The lock must be held.
+        """
+        results.pop(key, None)
+        results[key] = value
+        while len(results) > self._max_entries:
+            results.popitem(last=False)
+
+    def _template_key(self, template):
+        return (template.name, template.definition, getattr(template, "root_path", None))
@@ -0,0 +1,72 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import os
+import threading
+
+class ThumbnailSharer(object):
+    """
+    Sets the thumbnail of Shotgun entities, uploading each thumbnail file
+    only once.  The first entities a thumbnail is attached to get it with
+    a single upload and every later entity shares it from the first one,
+    rather than the same image being uploaded again for each publish.
+    """
+
+    def __init__(self, connection):
+        """
+        Construction
+
+        :param connection:  The Shotgun connection to use
+        """
+        self._connection = connection
+        self._sources = {}
+        self._lock = threading.Lock()
+
+    def attach(self, entities, path):
+        """
+        Set the thumbnail of a list of entities with a single request.
+
+        :param entities:    List of entity dictionaries with type and id keys
+        :param path:        The path of the thumbnail image
+        """
+        entities = [{"type": entity["type"], "id": entity["id"]} for entity in entities]
+        if not entities or not path:
+            return
+
+        key = self._key(path)
+        with self._lock:
+            source = self._sources.get(key)
+
+        if source:
+            try:
+                self._connection.share_thumbnail(entities, source_entity=source)
+                return
+            except Exception:
+                # the source thumbnail may still be processing so
+                # fall back to uploading it again:
+                pass
+
+        if len(entities) == 1:
+            self._connection.upload_thumbnail(entities[0]["type"], entities[0]["id"], path)
+        else:
+            self._connection.share_thumbnail(entities, thumbnail_path=path)
+        with self._lock:
+            self._sources.setdefault(key, entities[0])
+
+    def forget(self):
+        """
+        Forget the thumbnails that have been uploaded
+        """
+        with self._lock:
+            self._sources = {}
+
+    def _key(self, path):
+        stat = os.stat(path)
+        return (path, stat.st_size, stat.st_mtime)
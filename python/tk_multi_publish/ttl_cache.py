@@ -0,0 +1,68 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import time
+import threading
+
+# marks a missing value so None can be cached
+_MISSING = object()
+
+class TtlCache(object):
+    """
+    Cache of values that expire a fixed number of seconds after
+    they were stored
+    """
+
+    def __init__(self, ttl=60, clock=time.time):
+        """
+        Construction
+
+        :param ttl:     Seconds a value is kept for, 0 to never keep values
+        :param clock:   Function returning the current time in seconds
+        """
+        self._ttl = ttl
+        self._clock = clock
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """
+        Return the value stored for a key or default if there isn't
+        one or it has expired
+        """
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                return default
+            if self._clock() - entry[0] >= self._ttl:
+                del self._values[key]
+                return default
+            return entry[1]
+
+    def set(self, key, value):
+        if not self._ttl:
+            return
+        with self._lock:
+            self._values[key] = (self._clock(), value)
+
+    def get_or_create(self, key, create_fn):
+        """
+        Return the value stored for a key, calling create_fn to
+        create and store it if there isn't one
+        """
+        entry = self.get(key, _MISSING)
+        if entry is _MISSING:
+            entry = create_fn()
+            self.set(key, entry)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._values = {}
@@ -0,0 +1,421 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import os
+import json
+import time
+import uuid
+import shutil
+import socket
+import threading
+import collections
+
+try:
+    import Queue as queue
+except ImportError:
+    # python 3
+    import queue
+
+from .chunked_upload import ChunkedUploader, ShotgunTransport, TransportNotSupported
+
+class UploadJob(object):
+    """
+    A file to upload to a Shotgun entity.  If field is None the file is
+    uploaded as the thumbnail of the entity.
+    """
+
+    PENDING = "pending"
+    UPLOADING = "uploading"
+    DONE = "done"
+    FAILED = "failed"
+
+    def __init__(self, entity_type, entity_id, path, field=None, fallback_thumbnail_path=None, label=None):
+        """
+        Construction
+
+        :param entity_type:             The type of the entity to upload to
+        :param entity_id:               The id of the entity to upload to
+        :param path:                    The path of the file to upload
+        :param field:                   The field to upload the file to or None to
+                                        upload it as the thumbnail
+        :param fallback_thumbnail_path: Optional thumbnail to upload instead if the
+                                        file can't be uploaded
+        :param label:                   Name of the upload shown to the user
+        """
+        self.entity_type = entity_type
+        self.entity_id = entity_id
+        self.path = path
+        self.field = field
+        self.fallback_thumbnail_path = fallback_thumbnail_path
+        self.label = label or os.path.basename(path)
+        self.state = UploadJob.PENDING
+        self.attempts = 0
+        self.error = None
+        self.bytes_sent = 0
+        self.bytes_total = 0
+
+    def to_dict(self):
+        return {"entity_type": self.entity_type,
+                "entity_id": self.entity_id,
+                "path": self.path,
+                "field": self.field,
+                "fallback_thumbnail_path": self.fallback_thumbnail_path,
+                "label": self.label}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["entity_type"], data["entity_id"], data["path"], data.get("field"),
+                   data.get("fallback_thumbnail_path"), data.get("label"))
+
+class UploadQueue(object):
+    """
+    Uploads files to Shotgun in the background with a pool of worker
+    threads so that a publish doesn't have to wait for them.  Failed
+    uploads are retried with an increasing delay.
+
+    Jobs that haven't finished are written to a journal so that they can
+    be resumed if the session ends first.  Each session keeps its own
+    journal file in the journal folder and refreshes it regularly, and
+    only takes over the jobs of journals that have stopped being
+    refreshed, so two sessions never upload the same job.  When a state
+    folder is given files are uploaded to fields in chunks, so a retried
+    or resumed upload carries on from the last chunk sent.  When a
+    thumbnail folder is given, fallback thumbnails are copied into it as
+    jobs are queued, because the publish usually deletes its thumbnail
+    before a background upload needs it.
+    """
+
+    # seconds between refreshes of the journal of a running session
+    HEARTBEAT = 30.0
+
+    # seconds after which a journal that hasn't been refreshed belongs to
+    # a session that has gone away and its jobs can be taken over
+    STALE_AFTER = 300.0
+
+    # the number of finished jobs kept to report on
+    HISTORY = 200
+
+    def __init__(self, connection_factory, workers=2, max_attempts=4, backoff=5.0, journal_dir=None,
+                 state_dir=None, transport_factory=None, chunk_size=None, thumbnail_dir=None):
+        """
+        Construction
+
+        :param connection_factory:  Function returning a new Shotgun connection.  Each
+                                    worker thread uses its own connection.
+        :param workers:             The number of uploads to run at the same time
+        :param max_attempts:        The number of times to try each upload
+        :param backoff:             Seconds to wait before the first retry, doubled
+                                    for each retry after that
+        :param journal_dir:         Optional folder the journals of unfinished jobs are kept in
+        :param state_dir:           Optional folder to keep the state of chunked uploads in.
+                                    Files are uploaded in one request if this isn't set.
+        :param transport_factory:   Optional function called as transport_factory(connection, job)
+                                    returning the transport to upload the chunks with, defaults
+                                    to uploading them to Shotgun
+        :param chunk_size:          The size of each chunk in bytes
+        :param thumbnail_dir:       Optional folder to keep copies of the fallback
+                                    thumbnails of unfinished jobs in
+        """
+        self._connection_factory = connection_factory
+        self._workers = max(1, workers)
+        self._max_attempts = max(1, max_attempts)
+        self._backoff = backoff
+        self._journal_dir = journal_dir
+        self._owner = "%s-%d-%s" % (socket.gethostname(), os.getpid(), uuid.uuid4().hex[:8])
+        self._state_dir = state_dir
+        self._transport_factory = transport_factory or (
+            lambda connection, job: ShotgunTransport(connection, job.entity_type, job.entity_id, job.field))
+        self._chunk_size = chunk_size
+        self._thumbnail_dir = thumbnail_dir
+
+        # unfinished jobs, and the most recent finished ones:
+        self._jobs = []
+        self._finished = collections.deque(maxlen=UploadQueue.HISTORY)
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._threads = []
+
+    def start(self):
+        """
+        Start the worker threads and queue the jobs of any journals
+        left by sessions that have gone away
+        """
+        if self._threads:
+            return
+        self._stopping.clear()
+        for data in self._adopt_journals():
+            self._add(UploadJob.from_dict(data))
+        self._write_journal()
+        for _ in range(self._workers):
+            thread = threading.Thread(target=self._worker)
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+        if self._journal_dir:
+            thread = threading.Thread(target=self._heartbeat)
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=None):
+        """
+        Stop the worker threads.  Uploads in progress are finished first,
+        unfinished jobs stay in the journal.
+
+        :param timeout: Optional number of seconds to wait for each thread.  If
+                        any are still uploading after that the journal is left
+                        to go stale before another session takes over its jobs.
+        """
+        self._stopping.set()
+        for _ in range(self._workers):
+            self._queue.put(None)
+        threads, self._threads = self._threads, []
+        for thread in threads:
+            thread.join(timeout)
+        if not any(thread.is_alive() for thread in threads):
+            # nothing is uploading so the jobs can be taken over straight away:
+            self._write_journal(heartbeat=0)
+
+    def add(self, job):
+        """
+        Queue an UploadJob
+        """
+        if job.fallback_thumbnail_path and self._thumbnail_dir:
+            try:
+                job.fallback_thumbnail_path = self._keep_thumbnail(job.fallback_thumbnail_path)
+            except (IOError, OSError):
+                # the fallback is only used if the upload fails
+                pass
+        self._add(job)
+        self._write_journal()
+        return job
+
+    def jobs(self):
+        """
+        Return the jobs that haven't finished and the most recent
+        ones that have, most recent last
+        """
+        with self._lock:
+            return list(self._finished) + list(self._jobs)
+
+    def summary(self):
+        """
+        Return a dictionary of the number of jobs in each state
+        """
+        counts = dict((state, 0) for state in [UploadJob.PENDING, UploadJob.UPLOADING,
+                                               UploadJob.DONE, UploadJob.FAILED])
+        for job in self.jobs():
+            counts[job.state] += 1
+        return counts
+
+    def is_busy(self):
+        """
+        Return True if any jobs haven't finished
+        """
+        summary = self.summary()
+        return bool(summary[UploadJob.PENDING] or summary[UploadJob.UPLOADING])
+
+    def _add(self, job):
+        with self._lock:
+            self._jobs.append(job)
+        self._queue.put(job)
+
+    def _keep_thumbnail(self, path):
+        """
+        Return the path of a copy of a thumbnail in the thumbnail folder
+        that stays until the job using it has finished
+        """
+        if not os.path.isdir(self._thumbnail_dir):
+            try:
+                os.makedirs(self._thumbnail_dir)
+            except OSError:
+                # created by another session
+                if not os.path.isdir(self._thumbnail_dir):
+                    raise
+        kept_path = os.path.join(self._thumbnail_dir, "%s-%s%s" % (self._owner, uuid.uuid4().hex[:8],
+                                                                   os.path.splitext(path)[1]))
+        shutil.copyfile(path, kept_path)
+        return kept_path
+
+    def _release_thumbnail(self, job):
+        """
+        Remove the copy of the fallback thumbnail of a finished job
+        """
+        path = job.fallback_thumbnail_path
+        if (not path or not self._thumbnail_dir
+            or os.path.dirname(os.path.abspath(path)) != os.path.abspath(self._thumbnail_dir)):
+            return
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _heartbeat(self):
+        """
+        Heartbeat thread loop - refreshes the journal so other
+        sessions know the jobs in it are being uploaded
+        """
+        while not self._stopping.wait(UploadQueue.HEARTBEAT):
+            self._write_journal()
+
+    def _worker(self):
+        """
+        Worker thread loop - uploads jobs until it is stopped
+        """
+        connection = None
+        while True:
+            job = self._queue.get()
+            if job is None or self._stopping.is_set():
+                break
+
+            if connection is None:
+                try:
+                    connection = self._connection_factory()
+                except Exception as e:
+                    self._finish(job, "Failed to connect to Shotgun: %s" % e)
+                    continue
+            self._upload(connection, job)
+
+    def _upload(self, connection, job):
+        """
+        Upload a job, retrying with an increasing delay if it fails
+        """
+        job.state = UploadJob.UPLOADING
+        error = None
+        while job.attempts < self._max_attempts:
+            if job.attempts:
+                # wait before retrying unless the queue is stopped:
+                delay = self._backoff * 2 ** (job.attempts - 1)
+                if self._stopping.wait(delay):
+                    # left in the journal to resume next time:
+                    job.state = UploadJob.PENDING
+                    return
+            job.attempts += 1
+            try:
+                self._send(connection, job)
+                error = None
+                break
+            except Exception as e:
+                error = "%s" % e
+
+        if error and job.field and job.fallback_thumbnail_path:
+            # at least get a thumbnail onto the entity:
+            try:
+                connection.upload_thumbnail(job.entity_type, job.entity_id, job.fallback_thumbnail_path)
+            except Exception as e:
+                error = "%s, thumbnail upload also failed: %s" % (error, e)
+        self._finish(job, error)
+
+    def _send(self, connection, job):
+        """
+        Upload the file of a job
+        """
+        job.bytes_total = os.path.getsize(job.path)
+        if job.field and self._state_dir:
+            try:
+                transport = self._transport_factory(connection, job)
+            except TransportNotSupported:
+                transport = None
+            if transport:
+                def progress(bytes_sent, bytes_total):
+                    job.bytes_sent = bytes_sent
+                    job.bytes_total = bytes_total
+                key = "%s:%s:%s:%s" % (job.entity_type, job.entity_id, job.field, job.path)
+                ChunkedUploader(transport, self._state_dir, self._chunk_size).upload(job.path, key, progress)
+                return
+
+        if job.field:
+            connection.upload(job.entity_type, job.entity_id, job.path, job.field)
+        else:
+            connection.upload_thumbnail(job.entity_type, job.entity_id, job.path)
+        job.bytes_sent = job.bytes_total
+
+    def _finish(self, job, error):
+        job.error = error
+        job.state = UploadJob.FAILED if error else UploadJob.DONE
+        with self._lock:
+            if job in self._jobs:
+                self._jobs.remove(job)
+            self._finished.append(job)
+        self._write_journal()
+        self._release_thumbnail(job)
+
+    def _journal_path(self):
+        return os.path.join(self._journal_dir, "%s.json" % self._owner)
+
+    def _read_journal(self, path):
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except (IOError, OSError, ValueError):
+            return None
+        return data if isinstance(data, dict) else None
+
+    def _is_stale(self, data):
+        return time.time() - data.get("heartbeat", 0) > UploadQueue.STALE_AFTER
+
+    def _adopt_journals(self):
+        """
+        Take over the journals of sessions that have gone away, returning
+        the jobs in them
+        """
+        if not self._journal_dir or not os.path.isdir(self._journal_dir):
+            return []
+
+        jobs = []
+        for name in os.listdir(self._journal_dir):
+            path = os.path.join(self._journal_dir, name)
+            if not name.endswith(".json") or path == self._journal_path():
+                continue
+            data = self._read_journal(path)
+            if data is None or not self._is_stale(data):
+                continue
+
+            # only one session can rename the journal so only
+            # one of them takes over its jobs:
+            claimed_path = "%s.%s.claimed" % (path, self._owner)
+            try:
+                os.rename(path, claimed_path)
+            except OSError:
+                continue
+            data = self._read_journal(claimed_path) or {}
+            if data and not self._is_stale(data) and not os.path.exists(path):
+                # refreshed since it was read - give it back
+                os.rename(claimed_path, path)
+                continue
+            jobs.extend(data.get("jobs", []))
+            os.remove(claimed_path)
+        return jobs
+
+    def _write_journal(self, heartbeat=None):
+        """
+        Write the jobs that haven't finished to the journal of this session
+        """
+        if not self._journal_dir:
+            return
+        with self._lock:
+            data = {"owner": self._owner,
+                    "heartbeat": time.time() if heartbeat is None else heartbeat,
+                    "jobs": [job.to_dict() for job in self._jobs
+                             if job.state in (UploadJob.PENDING, UploadJob.UPLOADING)]}
+            path = self._journal_path()
+            if not data["jobs"]:
+                if os.path.exists(path):
+                    os.remove(path)
+                return
+            if not os.path.isdir(self._journal_dir):
+                os.makedirs(self._journal_dir)
+            temp_path = "%s.tmp" % path
+            with open(temp_path, "w") as f:
+                json.dump(data, f)
+            if os.path.exists(path):
+                os.remove(path)
+            os.rename(temp_path, path)
@@ -0,0 +1,144 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import os
+import json
+import time
+import hashlib
+import threading
+
+def watch_depths(definition, keys):
+    """
+    Return how many levels up from a path matching a template definition
+    each of the folders new versions can appear in is, from the parent of
+    the first path component that contains one of the keys down to the
+    parent of the last one.  When keys sit at more than one level a new
+    version may only change the folders below the first one.
+
+    :param definition:  The template definition, e.g. {Shot}/publish/v{version}/{Shot}.{SEQ}.exr
+    :param keys:        The names of the keys that vary between versions
+    """
+    parts = definition.replace("\\", "/").strip("/").split("/")
+    indices = [index for index, part in enumerate(parts)
+               if any("{%s}" % key in part for key in keys)]
+    if not indices:
+        return [1]
+    return list(range(len(parts) - indices[0], len(parts) - indices[-1] - 1, -1))
+
+class VersionIndex(object):
+    """
+    Remembers the highest version found on disk for each template and set
+    of fields, along with the modification times of the folders new
+    versions would appear in.  A lookup only scans the disk again once one
+    of those folders has changed, so after a warm start it costs one stat
+    per folder rather than a glob over every version.
+
+    The index is kept in one file per template root so it survives
+    between sessions.
+    """
+
+    # folders modified within this many seconds of being scanned aren't
+    # trusted as file systems with a coarse mtime resolution may be
+    # modified again without the mtime changing
+    MTIME_RESOLUTION = 2.0
+
+    def __init__(self, folder):
+        """
+        Construction
+
+        :param folder:  The folder the index files are kept in
+        """
+        self._folder = folder
+        self._roots = {}
+        self._lock = threading.Lock()
+
+    def highest_version(self, root, key, scan_fn):
+        """
+        Return the highest version for a key, scanning the disk if
+        the folders it was found in have changed.
+
+        :param root:    The root path of the template, which selects the index file
+        :param key:     String identifying the template and fields
+        :param scan_fn: Function scanning the disk, returning a tuple of the highest
+                        version and the list of folders new versions appear in
+        :returns:       The highest version, or 0 if there aren't any
+        """
+        entries = self._load(root)
+        with self._lock:
+            entry = entries.get(key)
+        if entry and self._is_current(entry["folders"]):
+            return entry["version"]
+
+        scanned_at = time.time()
+        version, folders = scan_fn()
+        if not folders:
+            # nothing to watch so it has to be scanned every time
+            return version
+
+        mtimes = {}
+        for folder in folders:
+            try:
+                mtime = os.stat(folder).st_mtime
+            except OSError:
+                mtime = None
+            if mtime is not None and scanned_at - mtime <= VersionIndex.MTIME_RESOLUTION:
+                mtime = None
+            mtimes[folder] = mtime
+
+        with self._lock:
+            entries[key] = {"version": version, "folders": mtimes}
+        self._save(root)
+        return version
+
+    def clear(self):
+        """
+        Forget the versions that have been loaded
+        """
+        with self._lock:
+            self._roots = {}
+
+    def _is_current(self, folders):
+        for folder, mtime in folders.items():
+            if mtime is None:
+                return False
+            try:
+                if os.stat(folder).st_mtime != mtime:
+                    return False
+            except OSError:
+                return False
+        return True
+
+    def _index_path(self, root):
+        return os.path.join(self._folder, "%s.json" % hashlib.sha1(root.encode("utf-8")).hexdigest())
+
+    def _load(self, root):
+        with self._lock:
+            entries = self._roots.get(root)
+            if entries is None:
+                try:
+                    with open(self._index_path(root), "r") as f:
+                        entries = json.load(f)
+                except (IOError, OSError, ValueError):
+                    entries = {}
+                self._roots[root] = entries
+            return entries
+
+    def _save(self, root):
+        with self._lock:
+            data = json.dumps(self._roots[root])
+        if not os.path.isdir(self._folder):
+            os.makedirs(self._folder)
+        path = self._index_path(root)
+        temp_path = "%s.%s.tmp" % (path, os.getpid())
+        with open(temp_path, "w") as f:
+            f.write(data)
+        if os.path.exists(path):
+            os.remove(path)
+        os.rename(temp_path, path)